@@ -0,0 +1,132 @@
+"""
+Benchmark of the clip meta lookup against a folder with a long result history.
+
+Inserts a folder with --results result items, plus a transcoded video item,
+into the Girder database at --mongo-uri, then times the previous lookup,
+which sorted every result item in Python, against _get_clip_meta.  The
+documents are removed afterwards.  Requires a running MongoDB.
+
+With --client-only no database is used, and only the client side of both
+lookups is timed: decoding the BSON reply of every result item, as the
+previous lookup received, against decoding the single item the indexed
+lookup receives.  Server time and network transfer are not included.
+
+    python benchmarks/bench_clip_meta.py --results 10000
+    python benchmarks/bench_clip_meta.py --results 10000 --client-only
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+import bson
+import cherrypy
+from bson.objectid import ObjectId
+from girder.models.file import File
+from girder.models.folder import Folder
+from girder.models.item import Item
+
+from viame_server.viame_detection import ViameDetection
+
+
+def legacy_clip_meta(folder):
+    detections = list(
+        Item().find({"meta.detection": str(folder["_id"])}).sort([("created", -1)])
+    )
+    detection = detections[0] if len(detections) else None
+    item = Item().findOne({"folderId": folder["_id"], "meta.codec": "h264"})
+    video = Item().childFiles(item)[0] if item else None
+    return detection, video
+
+
+def timed(func, folder, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(folder)
+    return (time.perf_counter() - start) / repeat
+
+
+def client_only(results, repeat: int):
+    """Time decoding the replies of the legacy and indexed lookups"""
+    everything = b"".join(bson.BSON.encode(doc) for doc in results)
+    latest = bson.BSON.encode(max(results, key=lambda doc: doc["created"]))
+    print(f"result items: {len(results)}  reply: {len(everything) / 1024:.0f} KiB")
+    for name, reply in (("legacy", everything), ("indexed", latest)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            bson.decode_all(reply)
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f"{name:>8}: {elapsed * 1000:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--results", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--client-only", action="store_true")
+    parser.add_argument(
+        "--mongo-uri",
+        default=os.environ.get(
+            "GIRDER_MONGO_URI", "mongodb://localhost:27017/viame_benchmark"
+        ),
+    )
+    args = parser.parse_args()
+
+    owner = ObjectId()
+    folder = {
+        "_id": ObjectId(),
+        "name": "bench_clip_meta",
+        "parentId": owner,
+        "parentCollection": "user",
+        "baseParentId": owner,
+        "baseParentType": "user",
+    }
+    auxiliaryId = ObjectId()
+    now = datetime.utcnow()
+    results = [
+        {
+            "name": f"result_{index}.json",
+            "folderId": auxiliaryId,
+            "baseParentId": owner,
+            "baseParentType": "user",
+            "created": now - timedelta(minutes=index),
+            "meta": {"detection": str(folder["_id"])},
+        }
+        for index in range(args.results)
+    ]
+    video = {
+        "name": "video.mp4",
+        "folderId": folder["_id"],
+        "baseParentId": owner,
+        "baseParentType": "user",
+        "created": now,
+        "meta": {"codec": "h264"},
+    }
+    if args.client_only:
+        client_only(results, args.repeat)
+        return
+
+    cherrypy.config["database"]["uri"] = args.mongo_uri
+    Item().ensureIndex(([("meta.detection", 1), ("created", -1)], {}))
+    Item().ensureIndex(([("folderId", 1), ("meta.codec", 1)], {}))
+    Folder().collection.insert_one(folder)
+    Item().collection.insert_many(results + [video])
+    File().collection.insert_one({"name": "video.mp4", "itemId": video["_id"]})
+    try:
+        resource = ViameDetection()
+        print(f"result items: {args.results}")
+        for name, func in (
+            ("legacy", legacy_clip_meta),
+            ("indexed", resource._get_clip_meta),
+        ):
+            print(f"{name:>8}: {timed(func, folder, args.repeat) * 1000:.2f} ms")
+    finally:
+        File().collection.delete_many({"itemId": video["_id"]})
+        Item().collection.delete_many(
+            {"_id": {"$in": [doc["_id"] for doc in results + [video]]}}
+        )
+        Folder().collection.delete_one({"_id": folder["_id"]})
+
+
+if __name__ == "__main__":
+    main()
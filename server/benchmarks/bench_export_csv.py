@@ -0,0 +1,41 @@
+"""
+Throughput benchmark for viame.export_tracks_as_csv.
+
+Exports a synthetic interpolated result with several buffer sizes and
+reports rows/s, MB/s and the number of chunks handed to the consumer.
+A chunk size of 0 yields once per row, as the exporter used to.
+
+    python benchmarks/bench_export_csv.py --tracks 200 --keyframes 200
+"""
+import argparse
+import time
+
+from synthetic import synthetic_track_dict
+
+from viame_server.serializers import viame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tracks", type=int, default=100)
+    parser.add_argument("--keyframes", type=int, default=100)
+    parser.add_argument("--span", type=int, default=10)
+    args = parser.parse_args()
+
+    track_dict = synthetic_track_dict(args.tracks, args.keyframes, args.span)
+    for chunk_size in (0, 4 * 1024, 64 * 1024, 1024 * 1024):
+        chunks = rows = size = 0
+        start = time.perf_counter()
+        for chunk in viame.export_tracks_as_csv(track_dict, chunk_size=chunk_size):
+            chunks += 1
+            rows += chunk.count("\n")
+            size += len(chunk.encode())
+        elapsed = time.perf_counter() - start
+        print(
+            f"chunk_size {chunk_size:>8}: {rows / elapsed:>10,.0f} rows/s"
+            f"  {size / elapsed / 2 ** 20:6.2f} MB/s  {chunks:>8} chunks"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Memory benchmark for the track model representations.
+
+Builds the same detections as pydantic Feature models and as slotted
+CompactFeature objects and reports the traced bytes per detection.
+
+    python benchmarks/bench_model_memory.py --detections 1000000
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+from viame_server.serializers.models import CompactFeature, Feature
+
+
+def measure(factory, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory(i) for i in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--detections", type=int, default=1000000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    bounds = [
+        [left, top, left + 50, top + 40]
+        for left, top in (
+            (rng.randint(0, 1800), rng.randint(0, 1000)) for _ in range(1000)
+        )
+    ]
+    print(f"detections: {args.detections}")
+    for name, cls in (("pydantic", Feature), ("compact", CompactFeature)):
+        per_detection = measure(
+            lambda i: cls(frame=i, bounds=list(bounds[i % 1000])), args.detections
+        )
+        print(f"{name:>10}: {per_detection:,.0f} bytes/detection")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark of the JSON and MessagePack result formats.
+
+Encodes and decodes a synthetic result in both formats and reports the time
+taken and the size, raw and gzip compressed, of the encoded bytes.
+
+    python benchmarks/bench_result_format.py --tracks 1000 --keyframes 1000
+"""
+import argparse
+import gzip
+import json
+import time
+
+from synthetic import synthetic_track_dict
+
+from viame_server.serializers import binary
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tracks", type=int, default=1000)
+    parser.add_argument("--keyframes", type=int, default=1000)
+    args = parser.parse_args()
+
+    track_dict = synthetic_track_dict(args.tracks, args.keyframes, interpolate=False)
+    print(f"detections: {args.tracks * args.keyframes}")
+    formats = [("json", lambda d: json.dumps(d).encode(), lambda b: json.loads(b))]
+    if binary.msgpack_available():
+        formats.append(("msgpack", binary.dumps, binary.loads))
+    else:
+        print("msgpack is not installed, only JSON is measured")
+    for name, dumps, loads in formats:
+        data, encode = timed(dumps, track_dict)
+        _, decode = timed(loads, data)
+        compressed = len(gzip.compress(data, compresslevel=6))
+        print(
+            f"{name:>8}: encode {encode:.2f}s, decode {decode:.2f}s, "
+            f"{len(data) / 2**20:.1f} MiB, {compressed / 2**20:.1f} MiB gzip"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark for building Track models from stored result json.
+
+Compares validating construction, Track(**t), against
+Track.construct_trusted(t) on its own, and a validated CSV export against a
+trusted one, which reads each track into a ColumnarTrack.
+
+    python benchmarks/bench_trusted_tracks.py --tracks 500 --keyframes 500
+"""
+import argparse
+import time
+
+from synthetic import synthetic_track_dict
+
+from viame_server.serializers import viame
+from viame_server.serializers.models import Track
+
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tracks", type=int, default=200)
+    parser.add_argument("--keyframes", type=int, default=500)
+    args = parser.parse_args()
+
+    # No interpolation, so the export is dominated by building the tracks
+    track_dict = synthetic_track_dict(args.tracks, args.keyframes, interpolate=False)
+    detections = args.tracks * args.keyframes
+    print(f"tracks: {args.tracks}  detections: {detections}")
+
+    def export(trusted):
+        for _ in viame.export_tracks_as_csv(track_dict, trusted=trusted):
+            pass
+
+    for label, validated, trusted in (
+        (
+            "construct",
+            lambda: [Track(**t) for t in track_dict.values()],
+            lambda: [Track.construct_trusted(t) for t in track_dict.values()],
+        ),
+        ("export", lambda: export(False), lambda: export(True)),
+    ):
+        validated_time = best_of(validated)
+        trusted_time = best_of(trusted)
+        print(
+            f"{label:>10}: validated {validated_time:.3f}s"
+            f"  trusted {trusted_time:.3f}s"
+            f"  speedup {validated_time / trusted_time:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
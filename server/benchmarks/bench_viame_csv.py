@@ -0,0 +1,207 @@
+"""
+Throughput benchmark for VIAME CSV ingestion.
+
+Compares viame.load_csv_as_tracks against the previous row parser, which ran
+every regular expression against every trailing column, parsed the fixed
+columns twice per row and scanned a detection's geometry linearly.  Rows come
+from the deserializer test fixtures, repeated until the requested row count is
+reached.
+
+    python benchmarks/bench_viame_csv.py --rows 200000
+"""
+import argparse
+import csv
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tests"))
+
+from test_deserialize_viame_csv import test_tuple  # noqa: E402
+
+from viame_server.serializers import viame  # noqa: E402
+from viame_server.serializers.models import Feature, Track  # noqa: E402
+
+
+def create_geoJSONFeature(features, type, coords, key=''):
+    # Previous linear-scan implementation, which also appended duplicates
+    feature = {}
+    if "geometry" not in features:
+        features["geometry"] = {"type": "FeatureCollection", "features": []}
+    else:  # check for existing type/key pairs
+        if features["geometry"]["features"]:
+            for subfeature in features["geometry"]["features"]:
+                if (
+                    subfeature["geometry"]["type"] == type
+                    and subfeature["properties"]["key"] == key
+                ):
+                    feature = subfeature
+                    break
+    if "geometry" not in feature:
+        feature = {
+            "type": "Feature",
+            "properties": {"key": key},
+            "geometry": {"type": type},
+        }
+    if "Polygon" == type:
+        feature["geometry"]['coordinates'] = [coords]
+    elif type in ["LineString", "Point"]:
+        feature['geometry']['coordinates'] = coords
+
+    features['geometry']['features'].append(feature)
+
+
+def legacy_parse_row(row: List[str]):
+    features: Dict = {}
+    attributes = {}
+    track_attributes = {}
+    confidence_pairs = [
+        [row[i], float(row[i + 1])]
+        for i in range(9, len(row), 2)
+        if i + 1 < len(row) and row[i] and row[i + 1] and not row[i].startswith("(")
+    ]
+    head_tail: List = []
+    start = 9 + len(confidence_pairs) * 2
+
+    for j in range(start, len(row)):
+        head_regex = re.match(
+            r"^\(kp\) head ([0-9]+\.*[0-9]*) ([0-9]+\.*[0-9]*)", row[j]
+        )
+        if head_regex:
+            head_tail.insert(0, [float(head_regex[1]), float(head_regex[2])])
+            create_geoJSONFeature(features, 'Point', head_tail[0], 'head')
+        tail_regex = re.match(
+            r"^\(kp\) tail ([0-9]+\.*[0-9]*) ([0-9]+\.*[0-9]*)", row[j]
+        )
+        if tail_regex:
+            head_tail.insert(1, [float(tail_regex[1]), float(tail_regex[2])])
+            create_geoJSONFeature(
+                features, 'Point', head_tail[len(head_tail) - 1], 'tail'
+            )
+        atr_regex = re.match(r"^\(atr\) (.*?)\s(.+)", row[j])
+        if atr_regex:
+            attributes[atr_regex[1]] = viame._deduceType(atr_regex[2])
+        trk_regex = re.match(r"^\(trk-atr\) (.*?)\s(.+)", row[j])
+        if trk_regex:
+            track_attributes[trk_regex[1]] = viame._deduceType(trk_regex[2])
+        poly_regex = re.match(r"^(\(poly\)) ((?:[0-9]+\.*[0-9]*\s*)+)", row[j])
+        if poly_regex:
+            temp = [float(x) for x in poly_regex[2].split()]
+            coords = list(zip(temp[::2], temp[1::2]))
+            create_geoJSONFeature(features, 'Polygon', coords)
+
+    if len(head_tail) == 2:
+        create_geoJSONFeature(features, 'LineString', head_tail, 'HeadTails')
+    return features, attributes, track_attributes, confidence_pairs
+
+
+def legacy_load_csv_as_tracks(rows: List[str]) -> Dict[str, dict]:
+    reader = csv.reader(row for row in rows if (not row.startswith("#") and row))
+    tracks: Dict[int, Track] = {}
+    for row in reader:
+        geometry, attributes, track_attributes, confidence_pairs = legacy_parse_row(row)
+        trackId, _, frame, bounds, fishLength = viame.row_info(row)
+        feature = Feature(
+            frame=frame,
+            bounds=bounds,
+            attributes=attributes or None,
+            fishLength=fishLength if fishLength > 0 else None,
+            **geometry,
+        )
+        trackId, _, frame, _, _ = viame.row_info(row)
+
+        if trackId not in tracks:
+            tracks[trackId] = Track(begin=frame, end=frame, trackId=trackId)
+
+        track = tracks[trackId]
+        track.begin = min(frame, track.begin)
+        track.end = max(track.end, frame)
+        track.features.append(feature)
+        track.confidencePairs = confidence_pairs
+
+        for (key, val) in track_attributes.items():
+            track.attributes[key] = val
+
+    return {trackId: track.dict(exclude_none=True) for trackId, track in tracks.items()}
+
+
+def legacy_parse_only(rows: List[List[str]]):
+    for row in rows:
+        legacy_parse_row(row)
+        viame.row_info(row)
+        viame.row_info(row)
+
+
+def current_parse_only(rows: List[List[str]]):
+    for row in rows:
+        viame._parse_row(row)
+        viame.row_info(row)
+
+
+def fixture_rows(count: int) -> List[str]:
+    """Repeat the fixture rows, shifting frames so tracks keep growing."""
+    # Rows repeating a keypoint or polygon are skipped, the legacy parser
+    # duplicated their geometry so the outputs would not be comparable
+    template = [
+        line
+        for rows, _ in test_tuple
+        for line in rows
+        if legacy_parse_row(next(csv.reader([line])))
+        == viame._parse_row(next(csv.reader([line])))
+    ]
+    rows = []
+    frame_offset = 0
+    while len(rows) < count:
+        for line in template:
+            columns = line.split(",")
+            columns[2] = str(int(columns[2]) + frame_offset)
+            rows.append(",".join(columns))
+        frame_offset += 10
+    return rows[:count]
+
+
+def timed(fn, rows, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = fixture_rows(args.rows)
+    legacy_time, legacy_out = timed(legacy_load_csv_as_tracks, rows, args.repeat)
+    current_time, current_out = timed(viame.load_csv_as_tracks, rows, args.repeat)
+
+    split_rows = list(csv.reader(rows))
+    legacy_parse, _ = timed(legacy_parse_only, split_rows, args.repeat)
+    current_parse, _ = timed(current_parse_only, split_rows, args.repeat)
+
+    if json.dumps(legacy_out, sort_keys=True) != json.dumps(
+        current_out, sort_keys=True
+    ):
+        raise SystemExit("Output of the current parser differs from the legacy path")
+
+    print(f"rows: {len(rows)}")
+    for label, legacy, current in (
+        ("row parsing", legacy_parse, current_parse),
+        ("load_csv_as_tracks", legacy_time, current_time),
+    ):
+        print(label)
+        for name, elapsed in (("legacy", legacy), ("current", current)):
+            print(f"{name:>10}: {elapsed:.3f}s  {len(rows) / elapsed:,.0f} rows/s")
+        print(f"   speedup: {legacy / current:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Scaling benchmark for process-pool CSV-to-track conversion.
+
+Writes a synthetic VIAME CSV built from the deserializer test fixtures, then
+times load_csv_as_tracks against load_csv_file_as_tracks_parallel for an
+increasing number of worker processes, checking the outputs are identical.
+
+    python benchmarks/bench_viame_csv_parallel.py --rows 500000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from bench_viame_csv import fixture_rows
+
+from viame_server.serializers import viame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as temp:
+        temp.write("\n".join(fixture_rows(args.rows)))
+        path = temp.name
+
+    try:
+        start = time.perf_counter()
+        with open(path) as f:
+            serial = viame.load_csv_as_tracks(f.read().splitlines())
+        serial_time = time.perf_counter() - start
+        expected = json.dumps(serial)
+        print(f"rows: {args.rows}  size: {os.path.getsize(path) / 2 ** 20:.1f} MiB")
+        print(f"  serial: {serial_time:.3f}s")
+
+        processes = 1
+        while processes <= args.max_processes:
+            start = time.perf_counter()
+            parallel = viame.load_csv_file_as_tracks_parallel(path, processes)
+            elapsed = time.perf_counter() - start
+            if json.dumps(parallel) != expected:
+                raise SystemExit(f"Output with {processes} processes differs")
+            print(
+                f"{processes:>8}: {elapsed:.3f}s  speedup {serial_time / elapsed:.2f}x"
+            )
+            processes *= 2
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Synthetic track results shared by the benchmarks.
+"""
+import random
+from typing import Dict
+
+
+def synthetic_track_dict(
+    tracks: int = 100,
+    keyframes: int = 100,
+    span: int = 10,
+    interpolate: bool = True,
+    seed: int = 0,
+) -> Dict[str, dict]:
+    """
+    Build a result with `tracks` tracks of `keyframes` keyframes each, placed
+    `span` frames apart.  With interpolation enabled every track expands to
+    (keyframes - 1) * span + 1 exported rows.
+    """
+    rng = random.Random(seed)
+    result = {}
+    for trackId in range(tracks):
+        features = []
+        for index in range(keyframes):
+            left, top = rng.randint(0, 1800), rng.randint(0, 1000)
+            feature = {
+                "frame": index * span,
+                "bounds": [left, top, left + rng.randint(10, 120), top + 80],
+                "interpolate": interpolate,
+                "keyframe": True,
+            }
+            if index % 10 == 0:
+                feature["attributes"] = {"visible": True}
+            features.append(feature)
+        result[str(trackId)] = {
+            "begin": 0,
+            "end": (keyframes - 1) * span,
+            "trackId": trackId,
+            "features": features,
+            "confidencePairs": [["fish", rng.random()], ["rock", rng.random()]],
+            "attributes": {"reviewed": "yes"},
+        }
+    return result
@@ -10,6 +10,7 @@ requirements = [
     "girder_jobs==3.0.3",
     "girder_worker==0.8.0",
     "girder_worker_utils==0.8.5",
+    "numpy",
     "pydantic",
     "pysnooper",
 ]
@@ -28,6 +29,7 @@ setup(
     ],
     description="Server side functionality of VIAMEWeb",
     install_requires=requirements,
+    extras_require={"msgpack": ["msgpack>=1.0"]},
     python_requires=">=3.7",
     license="Apache Software License 2.0",
     include_package_data=True,
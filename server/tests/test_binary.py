@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from viame_server import utils
+from viame_server.serializers import binary, viame
+
+track_dict = {
+    "1": {
+        "trackId": 1,
+        "begin": 0,
+        "end": 1,
+        "features": [{"frame": 0, "bounds": [1, 2, 3, 4], "fishLength": 1.5}],
+        "confidencePairs": [["fish", 0.9]],
+        "attributes": {"é": True},
+    }
+}
+
+
+@pytest.mark.parametrize(
+    "header,accepted",
+    [
+        ("application/x-msgpack", True),
+        ("application/json, application/msgpack;q=0.5", True),
+        ("application/x-msgpack;q=0", False),
+        ("*/*", False),
+        ("application/json", False),
+    ],
+)
+def test_accepts_msgpack(header: str, accepted: bool):
+    assert binary.accepts_msgpack(header) == accepted
+
+
+def test_read_msgpack_track_data(monkeypatch):
+    pytest.importorskip("msgpack")
+    data = binary.dumps(track_dict)
+    assert binary.loads(data) == track_dict
+
+    class MsgpackFile:
+        def download(self, file, headers=True):
+            return lambda: iter([data])
+
+    monkeypatch.setattr(utils, "File", MsgpackFile)
+    file = {"name": "result.msgpack", "exts": ["msgpack"], "size": len(data)}
+    tracks, _ = utils._readTrackData(file)
+    assert json.dumps(tracks) == json.dumps(track_dict)
+
+
+def test_csv_import_round_trip_with_delta():
+    pytest.importorskip("msgpack")
+    rows = [
+        "0,1.png,0,10,10,20,20,0.9,-1,fish,0.9",
+        "1,1.png,0,30,30,40,40,0.8,-1,rock,0.8",
+        "3,2.png,1,50,50,60,60,0.7,-1,fish,0.7",
+    ]
+    imported = viame.load_csv_as_tracks(rows)
+    assert 3 in imported
+    tracks = binary.loads(b"".join(utils.iterEncodedTracks(imported, "msgpack")))
+    assert list(tracks) == ["0", "1", "3"]
+
+    edited = {**tracks["3"], "confidencePairs": [["fish", 0.1]]}
+    utils.applyDelta(tracks, {"upsert": {"3": edited}, "delete": ["1"]})
+    compacted = binary.loads(binary.dumps(tracks))
+    assert list(compacted) == ["0", "3"]
+    assert compacted["3"]["confidencePairs"] == [["fish", 0.1]]
+
+
+def test_loads_legacy_int_keys():
+    pytest.importorskip("msgpack")
+    import msgpack
+
+    data = msgpack.packb({3: {"trackId": 3}}, use_bin_type=True)
+    assert binary.loads(data) == {"3": {"trackId": 3}}
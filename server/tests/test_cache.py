@@ -0,0 +1,52 @@
+import pytest
+
+from viame_server.cache import ResultCache
+
+
+def test_lru_eviction():
+    cache = ResultCache(maxBytes=10)
+    cache.put("a", 1, 4)
+    cache.put("b", 2, 4)
+    assert cache.get("a") == 1
+    cache.put("c", 3, 4)
+    # "b" was least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {
+        "entries": 2,
+        "bytes": 8,
+        "maxBytes": 10,
+        "policy": "lru",
+        "hits": 3,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def test_fifo_eviction():
+    cache = ResultCache(maxBytes=10, policy="fifo")
+    cache.put("a", 1, 4)
+    cache.put("b", 2, 4)
+    assert cache.get("a") == 1
+    cache.put("c", 3, 4)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_oversized_and_replaced_entries():
+    cache = ResultCache(maxBytes=10)
+    cache.put("big", 1, 11)
+    assert cache.get("big") is None
+    cache.put("a", 1, 6)
+    cache.put("a", 2, 8)
+    assert cache.get("a") == 2
+    assert cache.stats()["bytes"] == 8
+    cache.invalidate("a")
+    assert cache.stats()["bytes"] == 0
+    assert cache.stats()["evictions"] == 0
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        ResultCache(maxBytes=10, policy="random")
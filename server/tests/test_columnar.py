@@ -0,0 +1,76 @@
+import json
+from typing import Dict
+
+import pytest
+
+from viame_server.serializers import models, viame
+from viame_server.serializers.columnar import ColumnarTrack, ColumnarTrackStore
+
+rows = [
+    "0,1.png,0,884.66,510,1219.66,737.66,1,-1,typestring,0.55",
+    "0,2.png,1,111,222,3333,444,1,12.5,typestring,0.55",
+    "2,3.png,2,10,50,20,35,1,-1,type3,0.765,(kp) head 22.4534 45.6564,(kp) tail 55.232 22.3445",
+    "4,5.png,5,10,10,20,20,1,-1,type1,0.89,type2,0.65,(poly) 1 2.34 3 4 5 6 7 8.08 9 10",
+    "5,6.png,6,10,10,20,20,1,-1,type1,0.89,(atr) attrNAME spaced attr name,(trk-atr) booleanAttr true",
+]
+
+track_dicts = [
+    viame.load_csv_as_tracks(rows),
+    {
+        "1": models.Track(
+            begin=1,
+            end=3,
+            trackId=1,
+            features=[
+                models.Feature(frame=1, bounds=[2, 2, 4, 4], interpolate=True),
+                models.Feature(frame=3, bounds=[4, 4, 8, 8], interpolate=None),
+            ],
+            confidencePairs=[["foo", 0.2], ["bar", 0.9]],
+        ).dict(exclude_none=True),
+        "2": models.Track(begin=0, end=0, trackId=2).dict(exclude_none=True),
+    },
+]
+
+
+@pytest.mark.parametrize("track_dict", track_dicts)
+def test_round_trip(track_dict: Dict[str, dict]):
+    store = ColumnarTrackStore.from_track_dict(track_dict)
+    assert json.dumps(store.to_track_dict()) == json.dumps(track_dict)
+
+
+def test_columns():
+    track = ColumnarTrack.from_dict(track_dicts[0][0])
+    assert track.frames.tolist() == [0, 1]
+    assert track.bounds.tolist() == [[885, 510, 1220, 738], [111, 222, 3333, 444]]
+    assert track.fishLength[1] == 12.5
+    assert track.sparse["geometry"] == {}
+    assert ColumnarTrackStore.from_track_dict(track_dicts[0]).detection_count == 5
+
+
+@pytest.mark.parametrize("track_dict", track_dicts)
+@pytest.mark.parametrize("excludeBelowThreshold", [False, True])
+def test_export_matches_validated(track_dict: Dict[str, dict], excludeBelowThreshold):
+    kwargs = {
+        "excludeBelowThreshold": excludeBelowThreshold,
+        "thresholds": {"default": 0.6, "bar": 0.95},
+        "filenames": [f"{frame}.png" for frame in range(5)],
+    }
+    validated = "".join(viame.export_tracks_as_csv(track_dict, **kwargs))
+    trusted = "".join(viame.export_tracks_as_csv(track_dict, trusted=True, **kwargs))
+    assert trusted == validated
+
+
+def test_export_reads_columns(monkeypatch):
+    """The trusted export must not build a Track or Feature per detection"""
+
+    def fail(*args, **kwargs):
+        raise AssertionError("model built during a trusted export")
+
+    monkeypatch.setattr(models.Feature, "construct_trusted", fail)
+    monkeypatch.setattr(models.Track, "construct_trusted", fail)
+    rows = list(viame.export_tracks_as_csv(track_dicts[1], trusted=True))
+    assert "".join(rows).splitlines()[:3] == [
+        "1,,1,2,2,4,4,0.9,-1,foo,0.2,bar,0.9",
+        "1,,2,3,3,6,6,0.9,-1,foo,0.2,bar,0.9",
+        "1,,3,4,4,8,8,0.9,-1,foo,0.2,bar,0.9",
+    ]
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from viame_server.serializers import models
+
+tracks = [
+    models.Track(
+        begin=1,
+        end=3,
+        trackId=7,
+        features=[
+            models.Feature(
+                frame=1,
+                bounds=[2, 2, 4, 4],
+                interpolate=True,
+                fishLength=12.5,
+                attributes={"visible": True, "note": "spaced value"},
+            ),
+            models.Feature(
+                frame=3,
+                bounds=[4, 4, 8, 8],
+                head=(1.5, 2.5),
+                keyframe=None,
+                geometry={
+                    "type": "FeatureCollection",
+                    "features": [
+                        {
+                            "type": "Feature",
+                            "properties": {"key": "head"},
+                            "geometry": {"type": "Point", "coordinates": [1.5, 2.5]},
+                        }
+                    ],
+                },
+            ),
+        ],
+        confidencePairs=[("fish", 0.5), ("rock", 0.25)],
+        attributes={"reviewed": "yes"},
+    ),
+    models.Track(begin=0, end=0, trackId=0),
+]
+
+
+@pytest.mark.parametrize("track", tracks)
+def test_compact_track_round_trip(track: models.Track):
+    compact = models.CompactTrack.from_model(track)
+    expected = json.dumps(track.dict(exclude_none=True))
+    assert json.dumps(compact.to_dict()) == expected
+    assert json.dumps(compact.to_model().dict(exclude_none=True)) == expected
+
+
+def test_compact_feature_has_no_instance_dict():
+    feature = models.CompactFeature(frame=0, bounds=[0, 0, 1, 1])
+    assert not hasattr(feature, "__dict__")
+    assert feature.to_dict() == models.Feature(frame=0, bounds=[0, 0, 1, 1]).dict(
+        exclude_none=True
+    )
+
+
+@pytest.mark.parametrize(
+    "value", [True, False, 1, 0, 1.0, 2, 0.5, "1", "yes", "Off", "3.5", "text", ""]
+)
+def test_coerce_attribute_value(value):
+    validated = models.Feature(frame=0, bounds=[0, 0, 1, 1], attributes={"a": value})
+    assert models.coerce_attributes({"a": value}) == validated.attributes
+    assert type(models.coerce_attribute_value(value)) is type(validated.attributes["a"])
+
+
+@pytest.mark.parametrize("value", [None, [1], {"a": 1}])
+def test_coerce_attribute_value_invalid(value):
+    with pytest.raises(ValueError):
+        models.coerce_attribute_value(value)
+
+
+def test_coerce_confidence_pairs():
+    assert models.coerce_confidence_pairs([["fish", 1], ("rock", "0.5")]) == [
+        ("fish", 1.0),
+        ("rock", 0.5),
+    ]
+    with pytest.raises(ValueError):
+        models.coerce_confidence_pairs([("fish", None)])
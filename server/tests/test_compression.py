@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from viame_server import compression, utils
+
+data = json.dumps({"1": {"trackId": 1, "features": [{"frame": 0}] * 100}}).encode()
+
+
+def test_decompress_chunks():
+    compressed = compression.compress(data, "gzip")
+    assert len(compressed) < len(data)
+    chunks = [compressed[i : i + 7] for i in range(0, len(compressed), 7)]
+    assert b"".join(compression.decompress_chunks(chunks, "gzip")) == data
+    with pytest.raises(ValueError):
+        compression.compress(data, "br")
+
+
+def test_file_encoding():
+    assert compression.file_encoding("result.json.gz") == "gzip"
+    assert compression.file_encoding("result.json.ZST") == "zstd"
+    assert compression.file_encoding("result.json") is None
+
+
+@pytest.mark.parametrize(
+    "header,accepted",
+    [
+        ("gzip, deflate, br", True),
+        ("deflate;q=1.0, x-gzip;q=0.5", True),
+        ("gzip;q=0, *", False),
+        ("*;q=0.1", True),
+        ("identity", False),
+        ("", False),
+    ],
+)
+def test_accepts_encoding(header: str, accepted: bool):
+    assert compression.accepts_encoding(header, "gzip") == accepted
+
+
+def test_read_compressed_track_data(monkeypatch):
+    compressed = compression.compress(data, "gzip")
+
+    class CompressedFile:
+        def download(self, file, headers=True):
+            return lambda: iter([compressed[:10], compressed[10:]])
+
+    monkeypatch.setattr(utils, "File", CompressedFile)
+    file = {"name": "result.json.gz", "exts": ["json", "gz"], "size": len(compressed)}
+    tracks, size = utils._readTrackData(file)
+    assert tracks == json.loads(data)
+    assert size == len(data)
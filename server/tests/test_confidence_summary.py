@@ -0,0 +1,131 @@
+import random
+
+import pytest
+
+from viame_server.model.confidence_summary import (
+    passing_track_keys,
+    summarize_confidence,
+    threshold_query,
+    track_confidence_document,
+)
+from viame_server.serializers import models, viame
+
+track_dict = {
+    "1": {
+        "begin": 0,
+        "end": 0,
+        "trackId": 1,
+        "features": [{"frame": 0, "bounds": [0, 0, 1, 1]}],
+        "confidencePairs": [["fish", 0.2], ["rock", 0.95], ["fish", 0.4]],
+    },
+    "2": {
+        "begin": 0,
+        "end": 0,
+        "trackId": 2,
+        "features": [{"frame": 0, "bounds": [0, 0, 1, 1]}],
+        "confidencePairs": [["fish", 1.0]],
+    },
+}
+
+
+def test_summarize_confidence():
+    summary = summarize_confidence(track_dict, bins=10)
+    assert summary["tracks"] == [
+        ["1", [["fish", 0.4], ["rock", 0.95]]],
+        ["2", [["fish", 1.0]]],
+    ]
+    assert summary["histograms"] == [
+        ["fish", [0, 0, 0, 0, 1, 0, 0, 0, 0, 1]],
+        ["rock", [0, 0, 0, 0, 0, 0, 0, 0, 0, 1]],
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_passing_track_keys_matches_exceeds_thresholds(seed):
+    rng = random.Random(seed)
+    types = ["fish", "rock", "crab"]
+    tracks = {
+        str(i): {
+            "begin": 0,
+            "end": 0,
+            "trackId": i,
+            "confidencePairs": [
+                [rng.choice(types), round(rng.random(), 2)]
+                for _ in range(rng.randint(1, 4))
+            ],
+        }
+        for i in range(50)
+    }
+    thresholds = {t: round(rng.random(), 2) for t in rng.sample(types, 2)}
+    thresholds["default"] = 0.5
+    expected = {
+        key
+        for key, track in tracks.items()
+        if models.Track(**track).exceeds_thresholds(thresholds)
+    }
+    assert passing_track_keys(summarize_confidence(tracks), thresholds) == expected
+
+
+def _matches_maximum(maximum, condition):
+    for field, value in condition.items():
+        if isinstance(value, dict) and "$gte" in value:
+            if maximum[field] < value["$gte"]:
+                return False
+        elif isinstance(value, dict) and "$nin" in value:
+            if maximum[field] in value["$nin"]:
+                return False
+        elif maximum[field] != value:
+            return False
+    return True
+
+
+def _matches(doc, query):
+    """Evaluate the subset of the query language used by threshold_query"""
+    return any(
+        any(
+            _matches_maximum(maximum, clause["maxima"]["$elemMatch"])
+            for maximum in doc["maxima"]
+        )
+        for clause in query["$or"]
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_threshold_query_matches_exceeds_thresholds(seed):
+    rng = random.Random(seed)
+    types = ["fish", "rock", "default"]
+    tracks = {
+        str(i): {
+            "begin": 0,
+            "end": 0,
+            "trackId": i,
+            "confidencePairs": [
+                [rng.choice(types), round(rng.random(), 2)]
+                for _ in range(rng.randint(0, 4))
+            ],
+        }
+        for i in range(50)
+    }
+    thresholds = {t: round(rng.random(), 2) for t in rng.sample(types, 2)}
+    documents = [
+        track_confidence_document("item", key, maxima)
+        for key, maxima in summarize_confidence(tracks)["tracks"]
+    ]
+    query = threshold_query(thresholds)
+    expected = {
+        key
+        for key, track in tracks.items()
+        if models.Track(**track).exceeds_thresholds(thresholds)
+    }
+    assert {doc["key"] for doc in documents if _matches(doc, query)} == expected
+
+
+def test_export_with_passing():
+    thresholds = {"default": 0.5, "rock": 0.99}
+    passing = passing_track_keys(summarize_confidence(track_dict), thresholds)
+    assert passing == {"2"}
+    exported = "".join(
+        viame.export_tracks_as_csv(track_dict, True, thresholds, passing=passing)
+    )
+    assert exported == "".join(viame.export_tracks_as_csv(track_dict, True, thresholds))
+    assert exported.splitlines() == ["2,,0,0,0,1,1,1.0,-1,fish,1.0"]
@@ -0,0 +1,30 @@
+import json
+
+from viame_server.model.confidence_summary import summarize_confidence
+from viame_server.serializers import meva, models
+
+geom_yaml = """
+- { meta: "geom only, no types yaml" }
+- { geom: { id0: 0, id1: 4, ts0: 10, ts1: 0.33, g0: "1 2 3 4" } }
+- { geom: { id0: 1, id1: 4, ts0: 11, ts1: 0.37, g0: "2 3 4 5" } }
+- { geom: { id0: 2, id1: 9, ts0: 3, ts1: 0.1, g0: "5 6 7 8", keyframe: true } }
+"""
+
+
+def test_geom_only_tracks():
+    actor_map = {}
+    meva.deserialize_geom(geom_yaml, actor_map)
+    tracks = meva.parse_actor_map_to_tracks(actor_map)
+    track_dict = {trackId: track.to_dict() for trackId, track in tracks.items()}
+
+    for track in track_dict.values():
+        assert track["confidencePairs"] == [("other", meva.DefaultActorConfidence)]
+        # Same as the validated models would store
+        validated = models.Track(**track).dict(exclude_none=True)
+        assert json.dumps(track) == json.dumps(validated)
+    assert track_dict[1]["features"][1]["attributes"] == {
+        "timestamp": 0.37,
+        "geom_id": 1.0,
+    }
+    summary = summarize_confidence(track_dict)
+    assert summary["tracks"] == [["1", [["other", 1.0]]], ["2", [["other", 1.0]]]]
@@ -1,4 +1,5 @@
 import json
+import sys
 from typing import Dict, List
 
 import pytest
@@ -196,6 +197,67 @@ test_tuple = [
             },
         },
     ),
+    (
+        [
+            # Repeated keypoints and polygons replace earlier ones, never duplicate
+            "0,1.png,0,10,10,20,20,1,-1,type1,0.5,(kp) head 1 1,(kp) tail 3 3,"
+            "(poly) 1 2 3 4,(kp) head 2 2,(poly) 5 6 7 8",
+        ],
+        {
+            "0": {
+                "trackId": 0,
+                "attributes": {},
+                "confidencePairs": [["type1", 0.5]],
+                "features": [
+                    {
+                        "frame": 0,
+                        "bounds": [10, 10, 20, 20],
+                        "keyframe": True,
+                        "interpolate": False,
+                        "geometry": {
+                            "type": "FeatureCollection",
+                            "features": [
+                                {
+                                    "type": "Feature",
+                                    "properties": {"key": "head"},
+                                    "geometry": {
+                                        "type": "Point",
+                                        "coordinates": [2.0, 2.0],
+                                    },
+                                },
+                                {
+                                    "type": "Feature",
+                                    "properties": {"key": "tail"},
+                                    "geometry": {
+                                        "type": "Point",
+                                        "coordinates": [3.0, 3.0],
+                                    },
+                                },
+                                {
+                                    "type": "Feature",
+                                    "properties": {"key": ""},
+                                    "geometry": {
+                                        "type": "Polygon",
+                                        "coordinates": [[[5.0, 6.0], [7.0, 8.0]]],
+                                    },
+                                },
+                                {
+                                    "type": "Feature",
+                                    "properties": {"key": "HeadTails"},
+                                    "geometry": {
+                                        "type": "LineString",
+                                        "coordinates": [[2.0, 2.0], [3.0, 3.0]],
+                                    },
+                                },
+                            ],
+                        },
+                    },
+                ],
+                "begin": 0,
+                "end": 0,
+            },
+        },
+    ),
     (
         [
             # test that variable length is handled properly
@@ -243,3 +305,48 @@ test_tuple = [
 def test_read_csv(input: List[str], expected: Dict[str, dict]):
     out_json = viame.load_csv_as_tracks(input)
     assert json.dumps(out_json, sort_keys=True) == json.dumps(expected, sort_keys=True)
+
+
+def test_read_csv_attribute_coercion():
+    """Detection attributes are stored as validating a Feature would store them"""
+    row = "1,1.png,0,1,2,3,4,1,-1,fish,0.5,(atr) count 1,(atr) seen yes,(atr) size 2.5"
+    out_json = viame.load_csv_as_tracks([row])
+    assert out_json[1]["features"][0]["attributes"] == {
+        "count": True,
+        "seen": True,
+        "size": 2.5,
+    }
+
+
+@pytest.mark.parametrize("input,expected", test_tuple)
+@pytest.mark.parametrize("processes,chunks", [(1, 3), (2, 2), (2, 5)])
+def test_read_csv_parallel(
+    tmp_path, input: List[str], expected: Dict[str, dict], processes, chunks
+):
+    path = tmp_path / "input.csv"
+    path.write_text("\n".join(input) + "\n")
+    serial = viame.load_csv_as_tracks(input)
+    out_json = viame.load_csv_file_as_tracks_parallel(
+        str(path), processes=processes, chunks=chunks
+    )
+    assert json.dumps(out_json) == json.dumps(serial)
+
+
+# Set by the test in this process only, workers that were forked would see it
+_parent_marker = None
+
+
+def _read_parent_marker(_):
+    return _parent_marker
+
+
+def test_csv_pool_is_shared_and_spawned(monkeypatch):
+    monkeypatch.setattr(sys.modules[__name__], "_parent_marker", "parent")
+    pool = viame._csv_pool(2)
+    assert viame._csv_pool(2) is pool
+    assert pool.submit(_read_parent_marker, None).result() is None
+
+    viame._shutdown_csv_pools()
+    with pytest.raises(RuntimeError):
+        pool.submit(_read_parent_marker, None)
+    assert viame._csv_pool(2) is not pool
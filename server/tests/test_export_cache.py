@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from viame_server.export_cache import ExportCache
+
+
+def listing(cache: ExportCache):
+    return sorted(os.listdir(cache.directory))
+
+
+def test_tee_and_open(tmp_path):
+    cache = ExportCache(str(tmp_path / "exports"), 1000, chunkSize=4)
+    assert cache.open("a") is None
+    assert b"".join(cache.tee("a", ["héllo ", b"world"])) == "héllo world".encode()
+    entry = cache.open("a")
+    assert b"".join(cache.stream(entry)) == "héllo world".encode()
+    assert entry.closed
+
+
+def test_aborted_tee(tmp_path):
+    cache = ExportCache(str(tmp_path), 1000)
+
+    def failing():
+        yield "row\n"
+        raise RuntimeError()
+
+    with pytest.raises(RuntimeError):
+        list(cache.tee("a", failing()))
+    stream = cache.tee("b", ["row\n", "row\n"])
+    next(stream)
+    stream.close()
+    assert listing(cache) == []
+    assert cache.open("a") is None
+
+
+def test_lru_eviction(tmp_path):
+    cache = ExportCache(str(tmp_path), 25)
+    for index, key in enumerate("abc"):
+        list(cache.tee(key, [b"x" * 10]))
+        path = cache._path(key)
+        os.utime(path, (index, index))
+    # c was stored last, and evicted a
+    assert cache.open("a") is None
+    cache.open("b").close()
+    list(cache.tee("d", [b"x" * 10]))
+    assert cache.open("b") is not None
+    assert cache.open("c") is None
+    assert len(listing(cache)) == 2
+
+
+def test_disabled(tmp_path):
+    cache = ExportCache(str(tmp_path / "exports"), 0)
+    assert list(cache.tee("a", ["row"])) == [b"row"]
+    assert cache.open("a") is None
+    assert not os.path.exists(cache.directory)
+
+
+def test_contains(tmp_path):
+    cache = ExportCache(str(tmp_path), 1000)
+    assert not cache.contains("a")
+    list(cache.tee("a", [b"row"]))
+    os.utime(cache._path("a"), (0, 0))
+    assert cache.contains("a")
+    assert os.path.getmtime(cache._path("a")) > 0
+
+
+def test_partial_entries(tmp_path):
+    cache = ExportCache(str(tmp_path), 25, partialMaxAge=60)
+    stale = tmp_path / "crashed.partial"
+    stale.write_bytes(b"x" * 10)
+    os.utime(stale, (0, 0))
+    active = tmp_path / "active.partial"
+    active.write_bytes(b"x" * 10)
+    list(cache.tee("a", [b"x" * 10]))
+    os.utime(cache._path("a"), (1, 1))
+    list(cache.tee("b", [b"x" * 10]))
+    # The stale partial is swept, the active one still counts against maxBytes
+    assert listing(cache) == sorted(
+        ["active.partial", os.path.basename(cache._path("b"))]
+    )
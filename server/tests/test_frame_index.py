@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from viame_server import event
+
+
+def test_invalidate_frame_index(monkeypatch):
+    invalidated = []
+
+    class FakeFrameIndex:
+        def invalidate(self, folderId):
+            invalidated.append(folderId)
+
+    monkeypatch.setattr(event, "FrameIndex", FakeFrameIndex)
+    for name in ["frame_001.PNG", "frame_002.jpg", "result.json.gz", "frame.tif"]:
+        event.invalidate_frame_index(
+            SimpleNamespace(info={"name": name, "folderId": name})
+        )
+    assert invalidated == ["frame_001.PNG", "frame_002.jpg"]
+
+
+def save(monkeypatch, item, stored):
+    """Run the handlers of an item save, with stored the item before it"""
+
+    class FakeItem:
+        def findOne(self, query, fields=None):
+            assert query == {"_id": item["_id"]}
+            return stored
+
+    monkeypatch.setattr(event, "Item", FakeItem)
+    event.capture_frame_index_change(SimpleNamespace(info=item))
+    event.invalidate_frame_index(SimpleNamespace(info=item))
+
+
+def test_invalidate_frame_index_on_move_and_rename(monkeypatch):
+    invalidated = []
+
+    class FakeFrameIndex:
+        def invalidate(self, folderId):
+            invalidated.append(folderId)
+
+    monkeypatch.setattr(event, "FrameIndex", FakeFrameIndex)
+    image = {"_id": "i", "name": "frame_01.png", "folderId": "source"}
+
+    # Moved out of the sequence
+    save(monkeypatch, {**image, "folderId": "target"}, image)
+    assert invalidated == ["source", "target"]
+    invalidated.clear()
+
+    # Renamed to a name that is no longer an image
+    save(monkeypatch, {**image, "name": "frame_01.txt"}, image)
+    assert invalidated == ["source"]
+    invalidated.clear()
+
+    # Renamed to an image name
+    save(monkeypatch, image, {**image, "name": "frame_01.txt"})
+    assert invalidated == ["source"]
+    invalidated.clear()
+
+    # Saved in place, and created
+    save(monkeypatch, image, image)
+    assert invalidated == ["source"]
+    invalidated.clear()
+    created = {"name": "frame_02.png", "folderId": "source"}
+    event.capture_frame_index_change(SimpleNamespace(info=created))
+    event.invalidate_frame_index(SimpleNamespace(info=created))
+    assert invalidated == ["source"]
+    assert not event._movedImages.folders
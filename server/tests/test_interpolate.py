@@ -0,0 +1,66 @@
+import random
+from typing import List
+
+import pytest
+
+from viame_server.serializers import models
+
+
+def scalar_interpolate(a: models.Feature, b: models.Feature) -> List[List[int]]:
+    """Reference: the per-frame computation interpolate() originally used"""
+    frame_range = b.frame - a.frame
+    result = []
+    for frame in range(1, frame_range):
+        delta = frame / frame_range
+        inverse_delta = 1 - delta
+        result.append(
+            [
+                round((abox * delta) + (bbox * inverse_delta))
+                for (abox, bbox) in zip(a.bounds, b.bounds)
+            ]
+        )
+    return result
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_interpolate_bounds_matches_scalar(seed: int):
+    rng = random.Random(seed)
+    for _ in range(25):
+        a_frame = rng.randint(0, 1000)
+        # Small even ranges produce many exact .5 ties
+        frame_range = rng.choice([1, 2, 4, rng.randint(1, 600)])
+        a = models.Feature(
+            frame=a_frame,
+            bounds=[rng.randint(0, 4000) for _ in range(4)],
+            interpolate=True,
+        )
+        b = models.Feature(
+            frame=a_frame + frame_range,
+            bounds=[rng.randint(0, 4000) for _ in range(4)],
+        )
+        expected = scalar_interpolate(a, b)
+        bounds = models.interpolate_bounds(a.bounds, b.bounds, frame_range)
+        assert bounds.tolist() == expected
+
+        features = models.interpolate(a, b)
+        assert features[0] is a
+        assert [f.bounds for f in features[1:]] == expected
+        assert [f.frame for f in features] == list(range(a.frame, b.frame))
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 7, 4096])
+def test_iter_interpolated_blocks(block_size: int):
+    a = models.Feature(frame=5, bounds=[0, 10, 99, 51], interpolate=True)
+    b = models.Feature(frame=42, bounds=[17, 3, 120, 80])
+    expected = models.interpolate_bounds(a.bounds, b.bounds, b.frame - a.frame)
+    pairs = list(models.iter_interpolated(a, b, block_size=block_size))
+    assert [frame for frame, _ in pairs] == list(range(6, 42))
+    assert [bounds for _, bounds in pairs] == expected.tolist()
+
+
+def test_interpolate_bounds_rejects_empty_range():
+    with pytest.raises(ValueError):
+        models.interpolate_bounds([0, 0, 1, 1], [2, 2, 3, 3], 0)
+    a = models.Feature(frame=3, bounds=[0, 0, 1, 1])
+    with pytest.raises(ValueError):
+        next(models.iter_interpolated(a, a))
@@ -0,0 +1,51 @@
+import pytest
+
+from viame_server.serializers.intervals import TrackIntervalIndex, trim_track
+
+track_dict = {
+    "1": {"begin": 10, "end": 20},
+    "2": {"begin": 0, "end": 5},
+    "3": {"begin": 15, "end": 100},
+    "4": {"begin": 30, "end": 30},
+}
+
+
+@pytest.mark.parametrize(
+    "frameStart,frameEnd,expected",
+    [
+        (None, None, ["2", "1", "3", "4"]),
+        (5, 10, ["2", "1"]),
+        (21, 29, ["3"]),
+        (30, None, ["3", "4"]),
+        (None, 9, ["2"]),
+        (101, None, []),
+    ],
+)
+def test_overlapping(frameStart, frameEnd, expected):
+    index = TrackIntervalIndex.from_track_dict(track_dict)
+    assert index.overlapping(frameStart, frameEnd) == expected
+    brute = [
+        key
+        for key, track in track_dict.items()
+        if (frameStart is None or track["end"] >= frameStart)
+        and (frameEnd is None or track["begin"] <= frameEnd)
+    ]
+    assert sorted(index.overlapping(frameStart, frameEnd)) == sorted(brute)
+
+
+def frames(track):
+    return [feature["frame"] for feature in track["features"]]
+
+
+def test_trim_track():
+    track = {
+        "begin": 0,
+        "end": 40,
+        "features": [{"frame": f} for f in range(0, 50, 10)],
+    }
+    assert frames(trim_track(track, 15, 25)) == [10, 20, 30]
+    assert frames(trim_track(track, 20, 20)) == [10, 20, 30]
+    assert frames(trim_track(track, None, 5)) == [0, 10]
+    assert frames(trim_track(track, 45, None)) == [40]
+    assert trim_track(track, 15, 25)["begin"] == 0
+    assert len(track["features"]) == 5
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+from viame_server import retention, utils
+from viame_server.retention import select_pruned
+
+now = datetime(2020, 6, 1, 12)
+
+
+def result(name: str, age: timedelta, digest=None, deltaCount=0) -> dict:
+    meta = {"resultHash": digest} if digest else {}
+    if deltaCount:
+        meta["deltaCount"] = deltaCount
+    return {"name": name, "created": now - age, "meta": meta}
+
+
+def pruned_names(items, *args, **kwargs):
+    return [item["name"] for item in select_pruned(items, *args, **kwargs)]
+
+
+def test_select_pruned_dedupes():
+    items = [
+        result("a", timedelta(minutes=1), "x"),
+        result("b", timedelta(minutes=2), "x"),
+        result("c", timedelta(minutes=3), "y"),
+        result("d", timedelta(minutes=4)),
+        result("e", timedelta(minutes=5)),
+    ]
+    assert pruned_names(items, 10, 3600, 0) == ["b"]
+    assert pruned_names(items, 10, 3600, 0, seen=["y"]) == ["b", "c"]
+
+
+def test_select_pruned_keeps_items_with_deltas():
+    items = [
+        result("a", timedelta(minutes=1), "x", deltaCount=3),
+        result("b", timedelta(minutes=2), "x"),
+        result("c", timedelta(minutes=3), "x", deltaCount=1),
+        result("d", timedelta(minutes=4), "x"),
+    ]
+    # Only "b" records the hash, as the others hold more than their base file
+    assert pruned_names(items, 10, 3600, 0) == ["d"]
+    assert pruned_names(items, 10, 3600, 0, seen=["x"]) == ["b", "d"]
+
+
+def test_select_pruned_checkpoints():
+    hour = timedelta(hours=1)
+    items = [result(str(i), i * hour / 2) for i in range(10)]
+    # 0 and 1 are the newest, then the newest of each hour they do not cover
+    assert pruned_names(items, 2, 3600, 2) == ["2", "4", "6", "7", "8", "9"]
+    assert pruned_names(items, 0, 3600, 0) == [str(i) for i in range(10)]
+    assert pruned_names(items, 10, 3600, 0) == []
+
+
+def test_prune_results_uses_current_result(monkeypatch):
+    history = [
+        result("b", timedelta(minutes=2), "x"),
+        result("c", timedelta(minutes=3), "y"),
+    ]
+    removed = []
+
+    class FakeItem:
+        def remove(self, item):
+            removed.append(item["name"])
+
+    class FakeConfidenceSummary:
+        def removeForItem(self, item):
+            pass
+
+    current = result("a", timedelta(minutes=1), "x")
+    monkeypatch.setattr(utils, "getCurrentResultItem", lambda folder: current)
+    monkeypatch.setattr(retention, "find_history_items", lambda folder: history)
+    monkeypatch.setattr(retention, "Item", FakeItem)
+    monkeypatch.setattr(retention, "ConfidenceSummary", FakeConfidenceSummary)
+    assert retention.prune_results({"_id": "folder"}, 10, 3600, 0) == (1, 0)
+    assert removed == ["b"]
+
+    # A current result with deltas differs from its base file
+    current = result("a", timedelta(minutes=1), "x", deltaCount=2)
+    removed.clear()
+    assert retention.prune_results({"_id": "folder"}, 10, 3600, 0) == (0, 0)
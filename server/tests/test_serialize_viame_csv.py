@@ -1,5 +1,6 @@
 import csv
 import io
+import json
 import os
 from typing import Dict, List
 
@@ -201,10 +202,62 @@ test_tuple = [
             "0,2.png,1,111,222,3333,444,1.0,-1,typestring,1.0,(atr) detectionAttr frame 1 attr,(trk-atr) trackATTR TestTrack ATTR With Space",
         ],
     ),
+    (
+        {
+            "0": {
+                "trackId": 0,
+                "attributes": {},
+                "confidencePairs": [],
+                "features": [],
+                "begin": 0,
+                "end": 0,
+            },
+            "1": {
+                "trackId": 1,
+                "attributes": {},
+                "confidencePairs": [["typestring", 0.5]],
+                "features": [
+                    {
+                        "frame": 2,
+                        "bounds": [1, 2, 3, 4],
+                        "keyframe": True,
+                        "interpolate": False,
+                    },
+                ],
+                "begin": 2,
+                "end": 2,
+            },
+        },
+        [
+            "1,3.png,2,1,2,3,4,0.5,-1,typestring,0.5",
+        ],
+    ),
 ]
 
 
 @pytest.mark.parametrize("input,expected", test_tuple)
 def test_write_csv(input: Dict[str, dict], expected: List[str]):
-    for i, line in enumerate(viame.export_tracks_as_csv(input, filenames=filenames)):
-        assert line.strip(' ').rstrip() == expected[i]
+    output = "".join(viame.export_tracks_as_csv(input, filenames=filenames))
+    assert [line.strip(' ') for line in output.splitlines()] == expected
+
+
+@pytest.mark.parametrize("input,expected", test_tuple)
+@pytest.mark.parametrize("chunk_size", [0, 1, 50])
+def test_write_csv_chunked(input: Dict[str, dict], expected: List[str], chunk_size):
+    chunks = list(
+        viame.export_tracks_as_csv(input, filenames=filenames, chunk_size=chunk_size)
+    )
+    assert all(len(chunk) >= chunk_size for chunk in chunks[:-1])
+    assert "".join(chunks).splitlines() == expected
+
+
+@pytest.mark.parametrize("input,expected", test_tuple)
+def test_write_csv_trusted(input: Dict[str, dict], expected: List[str]):
+    for t in input.values():
+        trusted = models.Track.construct_trusted(t).dict(exclude_none=True)
+        validated = models.Track(**t).dict(exclude_none=True)
+        assert json.dumps(trusted) == json.dumps(validated)
+    output = "".join(
+        viame.export_tracks_as_csv(input, filenames=filenames, trusted=True)
+    )
+    assert output.splitlines() == expected
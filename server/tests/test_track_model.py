@@ -0,0 +1,62 @@
+import bson
+import pytest
+
+from viame_server.model.track import (
+    DocumentFields,
+    ResultTrack,
+    document_track,
+    track_document,
+)
+
+track = {
+    "begin": 0,
+    "end": 4,
+    "trackId": 3,
+    "features": [
+        {"frame": 0, "bounds": [1, 2, 3, 4], "attributes": {"a.b": 1.0, "$x": "y"}},
+    ],
+    "confidencePairs": [["fish.adult", 0.5]],
+    "attributes": {"$where": True, "length.cm": 12.0},
+}
+
+
+def test_raw_track_is_not_a_valid_document():
+    with pytest.raises(bson.errors.InvalidDocument):
+        bson.encode({"folderId": "folder", **track}, check_keys=True)
+
+
+def test_track_document():
+    document = track_document("folder", track)
+    bson.encode(document, check_keys=True)
+    assert document["folderId"] == "folder"
+    assert {field: document[field] for field in DocumentFields} == {
+        field: track[field] for field in DocumentFields
+    }
+    assert document_track(document) == track
+
+
+def test_find_for_folder():
+    documents = [track_document("folder", {**track, "trackId": i}) for i in (1, 2)]
+
+    def find(query, fields, sort):
+        # Both projections used by findForFolder are inclusions
+        return [
+            {key: value for key, value in document.items() if fields.get(key)}
+            for document in documents
+        ]
+
+    # Not initialized, so no database connection is needed
+    model = ResultTrack.__new__(ResultTrack)
+    model.find = find
+    assert model.trackDict({"_id": "folder"}) == {
+        "1": {**track, "trackId": 1},
+        "2": {**track, "trackId": 2},
+    }
+    assert list(model.findForFolder({"_id": "folder"}, fields=["confidencePairs"])) == [
+        {"trackId": 1, "confidencePairs": track["confidencePairs"]},
+        {"trackId": 2, "confidencePairs": track["confidencePairs"]},
+    ]
+    assert list(model.findForFolder({"_id": "folder"}, fields=["features"]))[0] == {
+        "trackId": 1,
+        "features": track["features"],
+    }
@@ -0,0 +1,397 @@
+import copy
+import hashlib
+import json
+from datetime import datetime
+from typing import List
+
+import cherrypy
+import pytest
+from girder.exceptions import RestException
+
+from viame_server import utils
+from viame_server.cache import ResultCache
+from viame_server.model.confidence_summary import summarize_confidence
+from viame_server.serializers import binary, viame
+from viame_server.serializers.intervals import trim_track
+
+text = (
+    "# comment\r\n0,1.png,0,1,2,3,4,1,-1,type,1.0\n\n1,2.png,1,5,6,7,8,1,-1,é,0.5\r2,x"
+)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 4096])
+def test_iter_file_lines(monkeypatch, chunk_size: int):
+    data = text.encode("utf-8")
+    chunks: List[bytes] = [
+        data[i : i + chunk_size] for i in range(0, len(data), chunk_size)
+    ]
+
+    class ChunkedFile:
+        def download(self, file, headers=True):
+            return lambda: iter(chunks)
+
+    monkeypatch.setattr(utils, "File", ChunkedFile)
+    assert list(utils.iterFileLines({})) == text.splitlines()
+
+
+def test_load_result_tracks(monkeypatch):
+    contents = {
+        "result.json": {"1": {"trackId": 1}, "2": {"trackId": 2}},
+        "delta_000002.json": {"upsert": {"3": {"trackId": 3}}, "delete": ["3"]},
+        "delta_000001.json": {"upsert": {"3": {"trackId": 30}}, "delete": [1]},
+    }
+    files = [{"name": name} for name in contents]
+
+    class FakeItem:
+        def childFiles(self, item, sort=None):
+            return files
+
+    monkeypatch.setattr(utils, "Item", FakeItem)
+    monkeypatch.setattr(utils, "getTrackData", lambda f: dict(contents[f["name"]]))
+    base, deltas = utils.getResultFiles({})
+    assert base["name"] == "result.json"
+    assert [f["name"] for f in deltas] == ["delta_000001.json", "delta_000002.json"]
+    assert utils.loadResultTracks({}) == {"2": {"trackId": 2}, "3": {"trackId": 3}}
+    assert utils.loadResultTracks(None) == {}
+
+
+@pytest.mark.parametrize("name,ext", [("result.json", "json"), ("a.csv", "csv")])
+def test_track_data_cache_charges_parsed_size(monkeypatch, name: str, ext: str):
+    cache = ResultCache(2**20)
+    monkeypatch.setattr(utils, "trackDataCache", cache)
+    monkeypatch.setattr(utils, "_readTrackData", lambda f: ({"1": {}}, 1000))
+    file = {"_id": "file", "name": name, "exts": [ext], "created": datetime.now()}
+    assert utils.getTrackData(file) == {"1": {}}
+    assert cache.stats()["bytes"] == 1000 * utils.parsedSizeFactors[ext]
+
+
+def test_cached_tracks_are_not_modified(monkeypatch):
+    """The read paths share the cached track dicts and must leave them as is"""
+    rows = [
+        "1,1.png,0,1,2,3,4,1,-1,fish,0.5,(atr) seen yes",
+        "1,2.png,4,5,6,7,8,1,2.5,fish,0.5",
+        "1,3.png,8,5,6,7,8,1,-1,fish,0.5",
+        "2,3.png,2,1,1,2,2,1,-1,rock,0.9,(kp) head 1 2,(kp) tail 3 4",
+    ]
+    base = {str(k): v for k, v in viame.load_csv_as_tracks(rows).items()}
+    base["1"]["features"][0]["interpolate"] = True
+    contents = {
+        "result.json": base,
+        "delta_000001.json": {"upsert": {"3": {**base["2"], "trackId": 3}}},
+    }
+    files = [
+        {"_id": name, "name": name, "exts": ["json"], "created": datetime.now()}
+        for name in contents
+    ]
+
+    class FakeItem:
+        def childFiles(self, item, sort=None):
+            return files
+
+    monkeypatch.setattr(utils, "Item", FakeItem)
+    monkeypatch.setattr(utils, "trackDataCache", ResultCache(2**20))
+    monkeypatch.setattr(utils, "trackIntervalCache", ResultCache(2**20))
+    monkeypatch.setattr(
+        utils, "_readTrackData", lambda f: (copy.deepcopy(contents[f["name"]]), 1)
+    )
+    tracks = utils.loadResultTracks({})
+    cached = [copy.deepcopy(utils.getTrackData(file)) for file in files]
+
+    utils.applyDelta(tracks, {"upsert": {"4": base["2"]}, "delete": ["1"]})
+    for trusted in (False, True):
+        list(viame.export_tracks_as_csv(utils.loadResultTracks({}), trusted=trusted))
+    for track in utils.loadResultTracksInWindow({}, 5, 6).values():
+        assert len(trim_track(track, 5, 6)["features"]) == 2
+    for format in ("json", "msgpack") if binary.msgpack_available() else ("json",):
+        b"".join(utils.iterEncodedTracks(utils.loadResultTracks({}), format))
+    summarize_confidence(utils.loadResultTracks({}))
+
+    assert [utils.getTrackData(file) for file in files] == cached
+
+
+@pytest.mark.parametrize("format", ["json", "msgpack"])
+def test_iter_encoded_tracks(format: str):
+    tracks = {1: {"trackId": 1, "features": [{"é": [1, 2.5]}]}, "2": {"trackId": 2}}
+    if format == "json":
+        expected = json.dumps(tracks).encode()
+    else:
+        pytest.importorskip("msgpack")
+        expected = binary.dumps(tracks)
+    assert b"".join(utils.iterEncodedTracks(tracks, format)) == expected
+    assert b"".join(utils.iterEncodedTracks({}, "json")) == b"{}"
+
+
+def test_move_existing_result_to_auxiliary_folder(monkeypatch):
+    calls = []
+    folder = {"_id": "folder", "baseParentType": "user", "baseParentId": "u"}
+    auxiliary = {"_id": "aux", "baseParentType": "user", "baseParentId": "u"}
+    items = [{"_id": "a", "size": 10}, {"_id": "b", "size": 5}]
+    edited = None
+
+    class FakeItem:
+        def findOne(self, query):
+            assert query["meta.trackBackend"] is True
+            return edited
+
+        def find(self, query, fields=None):
+            assert query == {"folderId": "folder", "meta.detection": "folder"}
+            return iter(items)
+
+        def update(self, query, update):
+            calls.append(("update", query["_id"]["$in"], update["$set"]["folderId"]))
+
+    class FakeFolder:
+        def createFolder(self, *args, **kwargs):
+            return auxiliary
+
+        def increment(self, query, field, amount, multi=True):
+            calls.append(("increment", query["_id"], amount))
+
+    monkeypatch.setattr(utils, "Item", FakeItem)
+    monkeypatch.setattr(utils, "Folder", FakeFolder)
+    utils.move_existing_result_to_auxiliary_folder(folder, None)
+    assert calls == [
+        ("update", ["a", "b"], "aux"),
+        ("increment", "folder", -15),
+        ("increment", "aux", 15),
+    ]
+    calls.clear()
+    items.clear()
+    utils.move_existing_result_to_auxiliary_folder(folder, None)
+    assert calls == []
+
+    edited = {"_id": "edited", "meta": {"trackBackend": True}}
+    monkeypatch.setattr(
+        utils,
+        "writeBackTrackBackendItem",
+        lambda f, item, user: calls.append(("writeBack", item["_id"])),
+    )
+    utils.move_existing_result_to_auxiliary_folder(folder, None)
+    assert calls == [("writeBack", "edited")]
+
+
+def test_write_back_track_backend_item(monkeypatch):
+    folder = {"_id": "folder"}
+    item = {"_id": "item", "name": "result_x.json", "meta": {"trackBackend": True}}
+    stale = {"_id": "stale", "name": "result_x.json", "exts": ["json"]}
+    tracks = {"1": {"trackId": 1}, "2": {"trackId": 2}}
+    uploads = []
+    removed = []
+    meta = {}
+
+    class FakeItem:
+        def childFiles(self, item, sort=None):
+            return [stale]
+
+        def setMetadata(self, item, metadata):
+            meta.update(metadata)
+
+    class FakeUpload:
+        def uploadFromFile(self, obj, size, name, **kwargs):
+            uploads.append((name, obj.read()))
+
+    class FakeFile:
+        def remove(self, file):
+            removed.append(file["_id"])
+
+    class FakeResultTrack:
+        def trackDict(self, folder):
+            return tracks
+
+    monkeypatch.setattr(utils, "Item", FakeItem)
+    monkeypatch.setattr(utils, "Upload", FakeUpload)
+    monkeypatch.setattr(utils, "File", FakeFile)
+    monkeypatch.setattr(utils, "ResultTrack", FakeResultTrack)
+    monkeypatch.setattr(utils, "resultEncoding", "identity")
+    utils.writeBackTrackBackendItem(folder, item, None)
+    assert uploads == [("result_x.json", json.dumps(tracks).encode())]
+    assert removed == ["stale"]
+    assert meta == {"resultHash": hashlib.sha256(uploads[0][1]).hexdigest()}
+
+
+def test_save_track_delta_reserves_numbers(monkeypatch):
+    """Saves working from the same stale item still get distinct delta files"""
+    stored = {"_id": "item", "meta": {"detection": "folder"}}
+    base = {"_id": "base", "name": "result_x.json", "exts": ["json"]}
+    uploads = []
+    replaced = []
+
+    class FakeCollection:
+        def find_one_and_update(self, filter, update, projection, return_document):
+            assert filter == {"_id": stored["_id"]}
+            for key, value in update["$inc"].items():
+                field = key.split(".")[1]
+                stored["meta"][field] = stored["meta"].get(field, 0) + value
+            stored.update(update["$set"])
+            return copy.deepcopy(stored)
+
+    class FakeItem:
+        collection = FakeCollection()
+
+        def childFiles(self, item, sort=None):
+            return [base]
+
+    class FakeUpload:
+        def uploadFromFile(self, obj, size, name, **kwargs):
+            uploads.append(name)
+
+    class FakeConfidenceSummary:
+        def update(self, item, tracks, upsert, delete):
+            pass
+
+    monkeypatch.setattr(utils, "Item", FakeItem)
+    monkeypatch.setattr(utils, "Upload", FakeUpload)
+    monkeypatch.setattr(utils, "ConfidenceSummary", FakeConfidenceSummary)
+    monkeypatch.setattr(utils, "saveTracks", lambda *args: replaced.append(args))
+    monkeypatch.setattr(utils, "deltaSaves", True)
+    monkeypatch.setattr(utils, "deltaMaxCount", 2)
+    upsert = {"1": {"trackId": 1}}
+    items = [copy.deepcopy(stored) for _ in range(3)]
+    for item in items:
+        utils.saveTrackDelta({"_id": "folder"}, item, {}, upsert, [], None)
+
+    assert uploads == ["delta_000001.json", "delta_000002.json"]
+    assert len(replaced) == 1
+    assert items[1]["meta"]["deltaCount"] == 2
+    assert items[1]["updated"] is not None
+
+
+def test_save_track_edit_track_backend(monkeypatch):
+    updated = datetime(2020, 1, 1)
+    item = {
+        "_id": "item",
+        "updated": updated,
+        "meta": {"trackBackend": True, "resultHash": "H", "detection": "folder"},
+    }
+    updates = []
+    applied = []
+
+    class FakeItem:
+        def childFiles(self, item, sort=None):
+            return []
+
+        def update(self, query, update, multi=True):
+            updates.append((query, update, multi))
+
+    class FakeResultTrack:
+        def applyDelta(self, folder, upsert, delete):
+            applied.append((upsert, delete))
+
+        def trackDict(self, folder, fields=None):
+            return {}
+
+    class FakeConfidenceSummary:
+        def update(self, item, tracks, upsert, delete):
+            pass
+
+    monkeypatch.setattr(utils, "Item", FakeItem)
+    monkeypatch.setattr(utils, "ResultTrack", FakeResultTrack)
+    monkeypatch.setattr(utils, "ConfidenceSummary", FakeConfidenceSummary)
+    monkeypatch.setattr(utils, "resultBackend", "track")
+    version = utils.resultVersion(item, None, [])
+    utils.saveTrackEdit({"_id": "folder"}, item, {"1": {"trackId": 1}}, [], None)
+
+    assert applied == [({"1": {"trackId": 1}}, [])]
+    assert updates[0] == ({"_id": "item"}, {"$unset": {"meta.resultHash": ""}}, False)
+    assert updates[1][1] == {"$set": {"updated": item["updated"]}}
+    assert "resultHash" not in item["meta"]
+    assert item["updated"] > updated
+    assert utils.resultVersion(item, None, []) != version
+
+
+def test_validate_track_delta():
+    upsert = {"3": {"trackId": 3, "begin": 0, "end": 0, "features": []}}
+    validated_upsert, validated_delete = utils.validateTrackDelta(upsert, [4, "5"])
+    assert list(validated_upsert) == ["3"]
+    assert validated_delete == ["4", "5"]
+    with pytest.raises(RestException):
+        utils.validateTrackDelta({"4": upsert["3"]}, [])
+    for invalid in ["abc", "1.5", None, True]:
+        with pytest.raises(RestException):
+            utils.validateTrackDelta({}, [invalid])
+
+
+@pytest.mark.parametrize(
+    "headers,notModified",
+    [
+        ({}, False),
+        ({"If-None-Match": '"abc"'}, True),
+        ({"If-None-Match": 'W/"abc", "def"'}, True),
+        ({"If-None-Match": '"def"'}, False),
+        ({"If-None-Match": "*"}, True),
+        ({"If-Modified-Since": "Mon, 01 Jun 2020 12:00:00 GMT"}, True),
+        ({"If-Modified-Since": "Mon, 01 Jun 2020 11:59:59 GMT"}, False),
+        ({"If-Modified-Since": "not a date"}, False),
+        (
+            {
+                "If-None-Match": '"def"',
+                "If-Modified-Since": "Mon, 01 Jun 2020 12:00:00 GMT",
+            },
+            False,
+        ),
+    ],
+)
+def test_conditional_response(monkeypatch, headers, notModified):
+    monkeypatch.setattr(cherrypy.request, "headers", headers, raising=False)
+    monkeypatch.setattr(cherrypy.response, "headers", {}, raising=False)
+    monkeypatch.setattr(cherrypy.response, "status", 200, raising=False)
+    lastModified = datetime(2020, 6, 1, 12, 0, 0, 500)
+    assert utils.conditionalResponse("abc", lastModified) == notModified
+    assert cherrypy.response.headers["ETag"] == '"abc"'
+    assert cherrypy.response.headers["Last-Modified"] == "Mon, 01 Jun 2020 12:00:00 GMT"
+    assert cherrypy.response.status == (304 if notModified else 200)
+
+
+def test_get_current_result_item(monkeypatch):
+    now = datetime(2020, 6, 1, 12)
+    folder = {"_id": "f", "meta": {"currentResult": "pointer"}}
+    items = {
+        "pointer": {
+            "_id": "pointer",
+            "folderId": "f",
+            "created": now,
+            "meta": {"detection": "f"},
+        },
+        "moved": {
+            "_id": "moved",
+            "folderId": "aux",
+            "created": now,
+            "meta": {"detection": "f"},
+        },
+    }
+    latest = {
+        "_id": "latest",
+        "folderId": "f",
+        "created": now,
+        "meta": {"detection": "f"},
+    }
+    readable = {"_id": "readable", "folderId": "aux", "meta": {"detection": "f"}}
+
+    class FakeItem:
+        def load(self, id, force=False):
+            return items.get(id)
+
+        def findOne(self, query, sort=None):
+            assert sort == [("created", -1)]
+            return latest
+
+        def hasAccess(self, item, user, level):
+            return user == "reader"
+
+        def findWithPermissions(self, query, sort=None, user=None, limit=0):
+            assert limit == 1
+            return iter([readable])
+
+    monkeypatch.setattr(utils, "Item", FakeItem)
+    # Created within the same millisecond as the sorted hit
+    assert utils.getCurrentResultItem(folder)["_id"] == "pointer"
+    assert utils.getCurrentResultItem(folder, "reader")["_id"] == "pointer"
+    assert utils.getCurrentResultItem(folder, "other")["_id"] == "readable"
+    # A newer result written without going through saveTracks
+    latest["created"] = datetime(2020, 6, 1, 13)
+    assert utils.getCurrentResultItem(folder)["_id"] == "latest"
+    folder["meta"]["currentResult"] = "moved"
+    latest["created"] = now
+    assert utils.getCurrentResultItem(folder)["_id"] == "latest"
+    del folder["meta"]["currentResult"]
+    assert utils.getCurrentResultItem(folder)["_id"] == "latest"
@@ -5,11 +5,17 @@ from os import getenv
 from pathlib import Path
 
 from girder import events, plugin
+from girder.models.item import Item
 from girder.models.setting import Setting
 from girder_worker.girder_plugin import WorkerPlugin
 
 from .client_webroot import ClientWebroot
-from .event import check_existing_annotations
+from .event import (
+    capture_frame_index_change,
+    check_existing_annotations,
+    invalidate_frame_index,
+    remove_frame_index,
+)
 from .viame import Viame
 from .viame_detection import ViameDetection
 
@@ -62,11 +68,23 @@ class GirderPlugin(plugin.GirderPlugin):
         )
         info["serverRoot"].api = info["serverRoot"].girder.api
 
+        # Result items are looked up, and rotated, by folder, the latest result
+        # of a clip by creation time, and transcoded videos by folder and codec
+        Item().ensureIndex(([("folderId", 1), ("meta.detection", 1)], {}))
+        Item().ensureIndex(([("meta.detection", 1), ("created", -1)], {}))
+        Item().ensureIndex(([("folderId", 1), ("meta.codec", 1)], {}))
+
         events.bind(
             "filesystem_assetstore_imported",
             "check_annotations",
             check_existing_annotations,
         )
+        events.bind("model.item.save", "viame_frame_index", capture_frame_index_change)
+        events.bind(
+            "model.item.save.after", "viame_frame_index", invalidate_frame_index
+        )
+        events.bind("model.item.remove", "viame_frame_index", invalidate_frame_index)
+        events.bind("model.folder.remove", "viame_frame_index", remove_frame_index)
 
         # Create dependency on worker
         plugin.getPlugin('worker').load(info)
@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+EvictionPolicies = {"lru", "fifo"}
+
+
+class ResultCache:
+    """
+    Thread-safe in-process cache bounded by the total size, in bytes, of its
+    entries.  Sizes are supplied by the caller when an entry is stored.
+
+    With the "lru" policy the least recently used entry is evicted first,
+    with "fifo" the oldest stored entry is, regardless of reads.
+    """
+
+    def __init__(self, maxBytes: int, policy: str = "lru"):
+        if policy not in EvictionPolicies:
+            raise ValueError(f"Unknown eviction policy {policy}")
+        self.maxBytes = maxBytes
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.policy == "lru":
+                self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int):
+        with self._lock:
+            self._discard(key)
+            if size > self.maxBytes:
+                return
+            while self._size + size > self.maxBytes:
+                _, (_, evictedSize) = self._entries.popitem(last=False)
+                self._size -= evictedSize
+                self.evictions += 1
+            self._entries[key] = (value, size)
+            self._size += size
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "maxBytes": self.maxBytes,
+                "policy": self.policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
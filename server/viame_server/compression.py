@@ -0,0 +1,81 @@
+import gzip
+import zlib
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# File extension of compressed results, by HTTP content-coding
+EncodingExtensions = {"gzip": "gz", "zstd": "zst"}
+
+
+def available_encodings():
+    return {"gzip", *({"zstd"} if zstandard is not None else ())}
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor().compress(data)
+    raise ValueError(f"Unsupported content encoding {encoding}")
+
+
+def compressing_writer(fileobj: BinaryIO, encoding: str) -> BinaryIO:
+    """
+    A writable stream compressing into fileobj.  Closing it flushes the
+    compressed data, but leaves fileobj open.
+    """
+    if encoding == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=6)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor().stream_writer(fileobj, closefd=False)
+    raise ValueError(f"Unsupported content encoding {encoding}")
+
+
+def decompress_chunks(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """Decompress a stream of chunks as they arrive"""
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == "zstd" and zstandard is not None:
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+    else:
+        raise ValueError(f"Unsupported content encoding {encoding}")
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    if encoding == "gzip":
+        data = decompressor.flush()
+        if data:
+            yield data
+
+
+def file_encoding(name: str) -> Optional[str]:
+    """The content-coding of a file, from its extension"""
+    extension = name.rsplit(".", 1)[-1].lower()
+    for encoding, encodingExtension in EncodingExtensions.items():
+        if extension == encodingExtension:
+            return encoding
+    return None
+
+
+def accepts_encoding(acceptEncoding: str, encoding: str) -> bool:
+    """Whether an Accept-Encoding header value allows a content-coding"""
+    qualities = {}
+    for part in acceptEncoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        coding = coding.strip().lower()
+        qualities["gzip" if coding == "x-gzip" else coding] = quality
+    return qualities.get(encoding, qualities.get("*", 0.0)) > 0
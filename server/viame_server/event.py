@@ -1,7 +1,14 @@
+import threading
+
 from girder.models.folder import Folder
 from girder.models.item import Item
 
-from viame_server.utils import ImageSequenceType, csvRegex
+from viame_server.model.frame_index import FrameIndex
+from viame_server.utils import ImageSequenceType, csvRegex, safeImageRegex
+
+# Folder each image being saved by this thread was moved or renamed out of,
+# by id of the item document, from model.item.save until model.item.save.after
+_movedImages = threading.local()
 
 
 def check_existing_annotations(event):
@@ -26,4 +33,40 @@ def check_existing_annotations(event):
         # FPS is hardcoded for now
         folder = Folder().findOne({"_id": item["folderId"]})
         folder["meta"].update({"type": ImageSequenceType, "fps": 30, "annotate": True})
+        # The imported annotations are now the latest result of the folder
+        folder["meta"].pop("currentResult", None)
         Folder().save(folder)
+
+
+def capture_frame_index_change(event):
+    """
+    Note the folder an image is moved or renamed out of, before it is saved,
+    so that its frame index is dropped once the item is written.
+    """
+    item = event.info
+    if "_id" not in item:
+        return
+    previous = Item().findOne({"_id": item["_id"]}, fields=["name", "folderId"])
+    if previous is None or not safeImageRegex.search(previous["name"]):
+        return
+    if (previous["folderId"], previous["name"]) != (item["folderId"], item["name"]):
+        if not hasattr(_movedImages, "folders"):
+            _movedImages.folders = {}
+        _movedImages.folders[id(item)] = previous["folderId"]
+
+
+def invalidate_frame_index(event):
+    """
+    Drop the frame index of the folder an image is saved to or removed from,
+    and of the folder it was moved or renamed out of
+    """
+    item = event.info
+    previousFolderId = getattr(_movedImages, "folders", {}).pop(id(item), None)
+    if previousFolderId is not None:
+        FrameIndex().invalidate(previousFolderId)
+    if safeImageRegex.search(item.get("name", "")):
+        FrameIndex().invalidate(item["folderId"])
+
+
+def remove_frame_index(event):
+    FrameIndex().removeForFolder(event.info)
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Hashable, Iterable, Iterator, Optional, Union
+
+
+class ExportCache:
+    """
+    Generated exports stored as files in a local directory, bounded by their
+    total size in bytes.  Reading an entry marks it as recently used, and the
+    least recently used entries are evicted first.
+
+    Entries are written while they are streamed to a client, and only become
+    visible once they are complete.  Partial entries count against the size
+    bound, and those left untouched for partialMaxAge seconds, like the ones
+    of a process that crashed, are removed on eviction.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        maxBytes: int,
+        chunkSize: int = 64 * 1024,
+        partialMaxAge: float = 3600,
+    ):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.chunkSize = chunkSize
+        self.partialMaxAge = partialMaxAge
+        self._lock = threading.Lock()
+
+    def _path(self, key: Hashable) -> str:
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.export")
+
+    def contains(self, key: Hashable) -> bool:
+        """Whether there is a stored entry for key, marking it as recently used"""
+        if self.maxBytes <= 0:
+            return False
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def open(self, key: Hashable) -> Optional[BinaryIO]:
+        """The stored entry for key, opened for reading, if there is one"""
+        if self.maxBytes <= 0:
+            return None
+        path = self._path(key)
+        try:
+            entry = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # Evicted meanwhile, the open file remains readable
+        return entry
+
+    def stream(self, entry: BinaryIO) -> Iterator[bytes]:
+        with entry:
+            chunk = entry.read(self.chunkSize)
+            while chunk:
+                yield chunk
+                chunk = entry.read(self.chunkSize)
+
+    def tee(
+        self, key: Hashable, chunks: Iterable[Union[bytes, str]]
+    ) -> Iterator[bytes]:
+        """Yield chunks, encoded as UTF-8, while storing them as the entry for key"""
+        chunks = (c.encode() if isinstance(c, str) else c for c in chunks)
+        if self.maxBytes <= 0:
+            yield from chunks
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".partial")
+        try:
+            with os.fdopen(fd, "wb") as output:
+                for chunk in chunks:
+                    output.write(chunk)
+                    yield chunk
+            try:
+                os.replace(temporary, self._path(key))
+            except FileNotFoundError:
+                pass  # Removed as stale while the client was stalled
+        finally:
+            # Left behind only when the stream was aborted or failed
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            partialBytes = 0
+            staleBefore = time.time() - self.partialMaxAge
+            with os.scandir(self.directory) as scan:
+                for dirEntry in scan:
+                    if not dirEntry.name.endswith((".export", ".partial")):
+                        continue
+                    try:
+                        stat = dirEntry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if dirEntry.name.endswith(".export"):
+                        entries.append((stat.st_mtime, stat.st_size, dirEntry.path))
+                    elif stat.st_mtime < staleBefore:
+                        try:
+                            os.remove(dirEntry.path)
+                        except FileNotFoundError:
+                            pass
+                    else:
+                        partialBytes += stat.st_size
+            total = partialBytes + sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.maxBytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
@@ -0,0 +1,221 @@
+###############################################################################
+# Copyright Kitware Inc. and Contributors
+# Distributed under the Apache License, 2.0 (apache.org/licenses/LICENSE-2.0)
+# See accompanying Copyright.txt and LICENSE files for details
+###############################################################################
+
+import itertools
+from typing import Any, Dict, Iterable, List, Set
+
+from girder.models.model_base import Model
+from pymongo import DeleteOne, ReplaceOne
+
+HistogramBins = 20
+
+# TrackConfidence documents inserted per round trip
+InsertBatchSize = 1000
+
+
+def summarize_confidence(
+    track_dict: Dict[Any, dict], bins: int = HistogramBins
+) -> Dict[str, Any]:
+    """
+    Summarize the confidence pairs of a result: the maximum confidence of each
+    type for every track, and per type a histogram of those track maxima over
+    [0, 1].  Types are kept in lists rather than as keys, since type names are
+    free-form and may not be valid Mongo keys.
+    """
+    tracks: List[List[Any]] = []
+    histograms: Dict[str, List[int]] = {}
+    for key, track in track_dict.items():
+        maxima: Dict[str, float] = {}
+        for confidenceType, confidence in track.get("confidencePairs", []):
+            if confidence > maxima.get(confidenceType, float("-inf")):
+                maxima[confidenceType] = confidence
+        tracks.append([str(key), [[t, c] for t, c in maxima.items()]])
+        for confidenceType, confidence in maxima.items():
+            histogram = histograms.setdefault(confidenceType, [0] * bins)
+            histogram[min(max(int(confidence * bins), 0), bins - 1)] += 1
+    return {
+        "bins": bins,
+        "histograms": [[t, counts] for t, counts in histograms.items()],
+        "tracks": tracks,
+    }
+
+
+def passing_track_keys(
+    summary: Dict[str, Any], thresholds: Dict[str, float]
+) -> Set[str]:
+    """Keys of the tracks for which Track.exceeds_thresholds would be true"""
+    defaultThresh = thresholds.get("default", 0)
+    return {
+        key
+        for key, maxima in summary["tracks"]
+        if any(
+            confidence >= thresholds.get(confidenceType, defaultThresh)
+            for confidenceType, confidence in maxima
+        )
+    }
+
+
+def track_confidence_document(itemId, key: str, maxima) -> Dict[str, Any]:
+    """The TrackConfidence document of a track, from its summarized maxima"""
+    return {
+        "itemId": itemId,
+        "key": key,
+        "maxima": [{"type": t, "confidence": c} for t, c in maxima],
+    }
+
+
+def threshold_query(thresholds: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Query on TrackConfidence documents matching the tracks for which
+    Track.exceeds_thresholds would be true
+    """
+    defaultThresh = thresholds.get("default", 0)
+    types = [t for t in thresholds if t != "default"]
+    clauses = [
+        {"maxima": {"$elemMatch": {"type": t, "confidence": {"$gte": thresholds[t]}}}}
+        for t in types
+    ]
+    clauses.append(
+        {
+            "maxima": {
+                "$elemMatch": {
+                    "type": {"$nin": types},
+                    "confidence": {"$gte": defaultThresh},
+                }
+            }
+        }
+    )
+    return {"$or": clauses}
+
+
+class TrackConfidence(Model):
+    """
+    The maximum confidence of each type for one track of a result item, one
+    document per track so that results of any size can be summarized, and
+    indexed so that threshold queries do not need to visit every track.
+    """
+
+    def initialize(self):
+        self.name = "track_confidence"
+        self.ensureIndices(
+            [
+                ([("itemId", 1), ("key", 1)], {"unique": True}),
+                ([("itemId", 1), ("maxima.type", 1), ("maxima.confidence", 1)], {}),
+            ]
+        )
+
+    def validate(self, model):
+        return model
+
+    def passingKeys(self, item, thresholds: Dict[str, float]) -> Set[str]:
+        query = {"itemId": item["_id"], **threshold_query(thresholds)}
+        return {doc["key"] for doc in self.find(query, fields={"key": True})}
+
+    def countPassing(self, item, thresholds: Dict[str, float]) -> int:
+        query = {"itemId": item["_id"], **threshold_query(thresholds)}
+        return self.collection.count_documents(query)
+
+    def removeForItem(self, item):
+        self.removeWithQuery({"itemId": item["_id"]})
+
+
+class ConfidenceSummary(Model):
+    """
+    Confidence summary of a result item, written alongside it by saveTracks so
+    that threshold queries do not need to load the result.  The histograms
+    are stored here, and the per-track maxima as TrackConfidence documents.
+    """
+
+    def initialize(self):
+        self.name = "confidence_summary"
+        self.ensureIndices(["itemId"])
+
+    def validate(self, model):
+        return model
+
+    def _save(self, item, summary: Dict[str, Any]):
+        self.collection.update_one(
+            {"itemId": item["_id"]},
+            {
+                "$set": {
+                    "bins": summary["bins"],
+                    "histograms": summary["histograms"],
+                    "trackCount": len(summary["tracks"]),
+                },
+                "$unset": {"tracks": ""},
+            },
+            upsert=True,
+        )
+
+    def create(self, item, track_dict):
+        summary = summarize_confidence(track_dict)
+        TrackConfidence().removeForItem(item)
+        documents = (
+            track_confidence_document(item["_id"], key, maxima)
+            for key, maxima in summary["tracks"]
+        )
+        batch = list(itertools.islice(documents, InsertBatchSize))
+        while batch:
+            TrackConfidence().collection.insert_many(batch, ordered=False)
+            batch = list(itertools.islice(documents, InsertBatchSize))
+        self._save(item, summary)
+
+    def update(
+        self,
+        item,
+        track_dict,
+        upsert: Iterable[str],
+        delete: Iterable[str],
+    ):
+        """
+        Update the summary of a result after a delta, where track_dict holds
+        the tracks after the delta was applied.  Only the documents of the
+        upserted and deleted tracks are written.
+        """
+        existing = self.findForItem(item)
+        if existing is None or "tracks" in existing:
+            self.create(item, track_dict)
+            return
+        summary = summarize_confidence(track_dict)
+        maxima = dict(summary["tracks"])
+        operations: List = [
+            DeleteOne({"itemId": item["_id"], "key": str(key)}) for key in delete
+        ]
+        operations.extend(
+            ReplaceOne(
+                {"itemId": item["_id"], "key": str(key)},
+                track_confidence_document(item["_id"], str(key), maxima[str(key)]),
+                upsert=True,
+            )
+            for key in upsert
+            if str(key) in maxima
+        )
+        if operations:
+            TrackConfidence().collection.bulk_write(operations, ordered=True)
+        self._save(item, summary)
+
+    def findForItem(self, item):
+        return self.findOne({"itemId": item["_id"]})
+
+    def passingKeys(self, summary, item, thresholds: Dict[str, float]) -> Set[str]:
+        # Summaries written before TrackConfidence embed the track maxima
+        if "tracks" in summary:
+            return passing_track_keys(summary, thresholds)
+        return TrackConfidence().passingKeys(item, thresholds)
+
+    def countPassing(self, summary, item, thresholds: Dict[str, float]) -> int:
+        if "tracks" in summary:
+            return len(passing_track_keys(summary, thresholds))
+        return TrackConfidence().countPassing(item, thresholds)
+
+    def trackCount(self, summary) -> int:
+        if "tracks" in summary:
+            return len(summary["tracks"])
+        return summary["trackCount"]
+
+    def removeForItem(self, item):
+        TrackConfidence().removeForItem(item)
+        self.removeWithQuery({"itemId": item["_id"]})
@@ -0,0 +1,67 @@
+###############################################################################
+# Copyright Kitware Inc. and Contributors
+# Distributed under the Apache License, 2.0 (apache.org/licenses/LICENSE-2.0)
+# See accompanying Copyright.txt and LICENSE files for details
+###############################################################################
+
+from typing import Any, Dict, List
+
+import pymongo
+from girder.models.item import Item
+from girder.models.model_base import Model
+
+from viame_server.utils import safeImageRegex
+
+
+class FrameIndex(Model):
+    """
+    The web-safe images of a folder in frame order, as parallel lists of item
+    ids and names.  The lists are dropped whenever an image of the folder
+    changes, and rebuilt on the next read.
+    """
+
+    def initialize(self):
+        self.name = "frame_index"
+        self.ensureIndices([([("folderId", 1)], {"unique": True})])
+
+    def validate(self, model):
+        return model
+
+    def build(self, folder) -> Dict[str, Any]:
+        # Only stored if the index was not invalidated while it was being built
+        self.collection.update_one(
+            {"folderId": folder["_id"]},
+            {"$setOnInsert": {"version": 0}},
+            upsert=True,
+        )
+        version = self.collection.find_one({"folderId": folder["_id"]})["version"]
+        items = Item().find(
+            {"folderId": folder["_id"], "lowerName": {"$regex": safeImageRegex}},
+            fields={"name": True},
+            sort=[("lowerName", pymongo.ASCENDING)],
+        )
+        itemIds: List[Any] = []
+        names: List[str] = []
+        for item in items:
+            itemIds.append(item["_id"])
+            names.append(item["name"])
+        index = {"itemIds": itemIds, "names": names}
+        self.collection.update_one(
+            {"folderId": folder["_id"], "version": version}, {"$set": index}
+        )
+        return index
+
+    def getForFolder(self, folder) -> Dict[str, Any]:
+        index = self.findOne({"folderId": folder["_id"], "names": {"$exists": True}})
+        if index is None:
+            index = self.build(folder)
+        return index
+
+    def invalidate(self, folderId):
+        self.collection.update_one(
+            {"folderId": folderId},
+            {"$inc": {"version": 1}, "$unset": {"itemIds": "", "names": ""}},
+        )
+
+    def removeForFolder(self, folder):
+        self.removeWithQuery({"folderId": folder["_id"]})
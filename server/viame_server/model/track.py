@@ -0,0 +1,120 @@
+###############################################################################
+# Copyright Kitware Inc. and Contributors
+# Distributed under the Apache License, 2.0 (apache.org/licenses/LICENSE-2.0)
+# See accompanying Copyright.txt and LICENSE files for details
+###############################################################################
+
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from girder.models.model_base import Model
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne
+
+# Track fields also stored outside the payload, for the indexes and projections
+DocumentFields = ["trackId", "begin", "end", "confidencePairs"]
+
+
+def track_document(folderId, track: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The document storing a track.  The track itself is an opaque json payload,
+    since its attribute names are free-form and may not be valid Mongo keys.
+    """
+    document = {field: track[field] for field in DocumentFields if field in track}
+    document["folderId"] = folderId
+    document["track"] = json.dumps(track)
+    return document
+
+
+def document_track(document: Dict[str, Any]) -> Dict[str, Any]:
+    """The track stored in a document, see track_document"""
+    return json.loads(document["track"])
+
+
+class ResultTrack(Model):
+    """
+    The tracks of a folder's current result, one document per track, used
+    instead of the result file when the "track" result backend is selected.
+    """
+
+    def initialize(self):
+        self.name = "result_track"
+        self.ensureIndices(
+            [
+                ([("folderId", 1), ("trackId", 1)], {"unique": True}),
+                ([("folderId", 1), ("begin", 1), ("end", 1)], {}),
+            ]
+        )
+
+    def validate(self, model):
+        return model
+
+    def replaceForFolder(self, folder, track_dict: Dict[str, dict]):
+        """Replace all the tracks of a folder"""
+        operations = [DeleteMany({"folderId": folder["_id"]})]
+        operations.extend(
+            InsertOne(track_document(folder["_id"], track))
+            for track in track_dict.values()
+        )
+        self.collection.bulk_write(operations, ordered=True)
+
+    def applyDelta(self, folder, upsert: Dict[str, dict], delete: Iterable[str]):
+        """
+        Delete then upsert tracks, each as a write to a single document.  Keys
+        are track ids, as validated by save_detection.
+        """
+        operations: List = [
+            DeleteOne({"folderId": folder["_id"], "trackId": int(track_id)})
+            for track_id in delete
+        ]
+        operations.extend(
+            ReplaceOne(
+                {"folderId": folder["_id"], "trackId": int(track_id)},
+                track_document(folder["_id"], track),
+                upsert=True,
+            )
+            for track_id, track in upsert.items()
+        )
+        if operations:
+            self.collection.bulk_write(operations, ordered=True)
+
+    def findForFolder(
+        self,
+        folder,
+        frameStart: Optional[int] = None,
+        frameEnd: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Tracks of a folder, limited to those overlapping a frame window.  Fields
+        in DocumentFields are read without decoding the tracks.
+        """
+        query = {"folderId": folder["_id"]}
+        if frameEnd is not None:
+            query["begin"] = {"$lte": frameEnd}
+        if frameStart is not None:
+            query["end"] = {"$gte": frameStart}
+        sort = [("trackId", 1)]
+        if fields is not None and set(fields) <= set(DocumentFields):
+            projection = {field: True for field in ["trackId", *fields]}
+            projection["_id"] = False
+            return self.find(query, fields=projection, sort=sort)
+        tracks = (
+            document_track(document)
+            for document in self.find(query, fields={"track": True}, sort=sort)
+        )
+        if fields is None:
+            return tracks
+        return (
+            {field: track[field] for field in ["trackId", *fields] if field in track}
+            for track in tracks
+        )
+
+    def trackDict(self, folder, **kwargs) -> Dict[str, dict]:
+        """Tracks of a folder keyed the same way as the result file"""
+        return {
+            str(track["trackId"]): track
+            for track in self.findForFolder(folder, **kwargs)
+        }
+
+    def removeForFolder(self, folder):
+        self.removeWithQuery({"folderId": folder["_id"]})
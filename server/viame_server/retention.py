@@ -0,0 +1,142 @@
+"""
+Retention of the result history kept in a folder's auxiliary folder.
+
+Results whose payload hash matches a newer result are dropped, the newest
+results are kept, and of the older ones only the newest of each checkpoint
+period not already covered by a retained result survives.  Pruning runs as
+a local girder_jobs job.
+"""
+import traceback
+from datetime import datetime
+from typing import Iterable, List, Tuple
+
+from girder.models.folder import Folder
+from girder.models.item import Item
+from girder_jobs.constants import JobStatus
+from girder_jobs.models.job import Job
+
+from viame_server.model.confidence_summary import ConfidenceSummary
+
+_epoch = datetime(1970, 1, 1)
+
+
+def select_pruned(
+    items: Iterable[dict],
+    keep: int,
+    checkpointSeconds: int,
+    maxCheckpoints: int,
+    seen: Iterable[str] = (),
+) -> List[dict]:
+    """
+    The result items to remove, out of items sorted newest first.  seen holds
+    the payload hashes of results that are kept regardless, like the current
+    result of the folder.  Items with deltas are never dropped as duplicates.
+    """
+    seen = set(seen)
+    covered = set()
+    checkpoints = 0
+    kept = 0
+    pruned = []
+    for item in items:
+        meta = item.get("meta", {})
+        digest = meta.get("resultHash")
+        # The hash covers the base file only, not the deltas replayed on top
+        if digest is not None and not meta.get("deltaCount"):
+            if digest in seen:
+                pruned.append(item)
+                continue
+            seen.add(digest)
+        period = int((item["created"] - _epoch).total_seconds() // checkpointSeconds)
+        if kept < keep:
+            kept += 1
+            covered.add(period)
+            continue
+        if period not in covered and checkpoints < maxCheckpoints:
+            checkpoints += 1
+            covered.add(period)
+            continue
+        pruned.append(item)
+    return pruned
+
+
+def find_history_items(folder, auxiliary=None):
+    """Result items of a folder moved to its auxiliary folder, newest first"""
+    if auxiliary is None:
+        auxiliary = Folder().findOne(
+            {
+                "parentId": folder["_id"],
+                "parentCollection": "folder",
+                "name": "auxiliary",
+            }
+        )
+    if auxiliary is None:
+        return []
+    return Item().find(
+        {"folderId": auxiliary["_id"], "meta.detection": str(folder["_id"])},
+        sort=[("created", -1)],
+    )
+
+
+def prune_results(
+    folder, keep: int, checkpointSeconds: int, maxCheckpoints: int
+) -> Tuple[int, int]:
+    """Remove the result history of a folder that is not retained"""
+    # utils schedules pruning, so it can only be imported once loaded
+    from viame_server.utils import getCurrentResultItem
+
+    current = getCurrentResultItem(folder)
+    seen = []
+    if current is not None and not current.get("meta", {}).get("deltaCount"):
+        seen = [current["meta"].get("resultHash")]
+    pruned = select_pruned(
+        find_history_items(folder), keep, checkpointSeconds, maxCheckpoints, seen
+    )
+    reclaimed = 0
+    for item in pruned:
+        reclaimed += item.get("size", 0)
+        ConfidenceSummary().removeForItem(item)
+        Item().remove(item)
+    return len(pruned), reclaimed
+
+
+def schedule_pruning(
+    folder, user, keep: int, checkpointSeconds: int, maxCheckpoints: int
+):
+    job = Job().createLocalJob(
+        module="viame_server.retention",
+        function="run",
+        title=f"Pruning result history of {folder['name']}",
+        type="viame_prune_results",
+        user=user,
+        kwargs={
+            "folderId": str(folder["_id"]),
+            "keep": keep,
+            "checkpointSeconds": checkpointSeconds,
+            "maxCheckpoints": maxCheckpoints,
+        },
+        asynchronous=True,
+    )
+    Job().scheduleJob(job)
+    return job
+
+
+def run(job):
+    kwargs = job["kwargs"]
+    job = Job().updateJob(job, status=JobStatus.RUNNING)
+    try:
+        folder = Folder().load(kwargs["folderId"], force=True)
+        removed, reclaimed = prune_results(
+            folder,
+            kwargs["keep"],
+            kwargs["checkpointSeconds"],
+            kwargs["maxCheckpoints"],
+        )
+        Job().updateJob(
+            job,
+            status=JobStatus.SUCCESS,
+            log=f"Removed {removed} results, reclaiming {reclaimed} bytes\n",
+            otherFields={"removedResults": removed, "reclaimedBytes": reclaimed},
+        )
+    except Exception:
+        Job().updateJob(job, status=JobStatus.ERROR, log=traceback.format_exc())
+        raise
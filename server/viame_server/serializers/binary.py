@@ -0,0 +1,53 @@
+"""
+MessagePack encoding of track JSON, used as an optional storage and wire
+format when the msgpack package is installed.
+"""
+from typing import Any, Dict, Iterator
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MsgpackMimeTypes = ("application/x-msgpack", "application/msgpack")
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def dumps(track_dict: Dict[Any, dict]) -> bytes:
+    """Encode track json, with keys written as strings as JSON would"""
+    return msgpack.packb(
+        {str(key): track for key, track in track_dict.items()}, use_bin_type=True
+    )
+
+
+def iter_dumps(track_dict: Dict[Any, dict]) -> Iterator[bytes]:
+    """The same bytes as dumps, one track at a time"""
+    packer = msgpack.Packer(use_bin_type=True)
+    yield packer.pack_map_header(len(track_dict))
+    for key, track in track_dict.items():
+        yield packer.pack(str(key)) + packer.pack(track)
+
+
+def loads(data: bytes) -> Dict[str, dict]:
+    # Results stored before keys were written as strings may have int keys
+    track_dict = msgpack.unpackb(data, raw=False, strict_map_key=False)
+    return {str(key): track for key, track in track_dict.items()}
+
+
+def accepts_msgpack(accept: str) -> bool:
+    """
+    Whether an Accept header value explicitly asks for MessagePack, wildcards
+    are ignored so that browsers keep receiving JSON.
+    """
+    for part in accept.split(","):
+        mimeType, _, params = part.strip().partition(";")
+        if mimeType.strip().lower() in MsgpackMimeTypes:
+            params = params.strip()
+            try:
+                return not params.startswith("q=") or float(params[2:]) > 0
+            except ValueError:
+                return False
+    return False
@@ -0,0 +1,175 @@
+"""
+Columnar in-memory representation of track JSON.
+
+Per-detection scalars (frame, bounds, fishLength, interpolate, keyframe) are
+held in contiguous NumPy arrays per track, while the rarely populated
+per-detection fields (attributes, geometry, head, tail) live in sparse side
+tables keyed by the detection's index.  Conversion to and from the dicts
+produced by Track.dict(exclude_none=True) is lossless.
+
+The trusted CSV export reads stored results through this representation, so
+it never builds a model object per detection.
+"""
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Flags are stored as int8 so that an absent (None) value survives a round trip
+_FLAG_ABSENT = -1
+
+# Keys of Feature in model field order, so to_dict() matches Feature.dict()
+_SPARSE_FIELDS = ("attributes", "geometry", "head", "tail")
+
+
+def _encode_flag(value: Optional[bool]) -> int:
+    return _FLAG_ABSENT if value is None else int(value)
+
+
+class ColumnarTrack:
+    """A single track whose detections are stored column-wise."""
+
+    __slots__ = (
+        "trackId",
+        "begin",
+        "end",
+        "confidencePairs",
+        "attributes",
+        "frames",
+        "bounds",
+        "fishLength",
+        "interpolate",
+        "keyframe",
+        "sparse",
+    )
+
+    def __init__(
+        self,
+        trackId: int,
+        begin: int,
+        end: int,
+        frames: np.ndarray,
+        bounds: np.ndarray,
+        fishLength: np.ndarray,
+        interpolate: np.ndarray,
+        keyframe: np.ndarray,
+        sparse: Optional[Dict[str, Dict[int, Any]]] = None,
+        confidencePairs: Optional[List[List[Any]]] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        if bounds.shape != (len(frames), 4):
+            raise ValueError('bounds must have shape (len(frames), 4)')
+        self.trackId = trackId
+        self.begin = begin
+        self.end = end
+        self.frames = frames
+        self.bounds = bounds
+        self.fishLength = fishLength
+        self.interpolate = interpolate
+        self.keyframe = keyframe
+        self.sparse = sparse or {field: {} for field in _SPARSE_FIELDS}
+        self.confidencePairs = confidencePairs or []
+        self.attributes = attributes or {}
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @classmethod
+    def from_dict(cls, track: Dict[str, Any]) -> 'ColumnarTrack':
+        features = track.get("features", [])
+        sparse: Dict[str, Dict[int, Any]] = {field: {} for field in _SPARSE_FIELDS}
+        for index, feature in enumerate(features):
+            for field in _SPARSE_FIELDS:
+                value = feature.get(field)
+                if value is not None:
+                    sparse[field][index] = value
+        return cls(
+            trackId=track["trackId"],
+            begin=track["begin"],
+            end=track["end"],
+            frames=np.array([f["frame"] for f in features], dtype=np.int64),
+            bounds=np.array([f["bounds"] for f in features], dtype=np.int64).reshape(
+                len(features), 4
+            ),
+            fishLength=np.array(
+                [f.get("fishLength", np.nan) for f in features], dtype=np.float64
+            ),
+            interpolate=np.array(
+                [_encode_flag(f.get("interpolate")) for f in features], dtype=np.int8
+            ),
+            keyframe=np.array(
+                [_encode_flag(f.get("keyframe")) for f in features], dtype=np.int8
+            ),
+            sparse=sparse,
+            confidencePairs=track.get("confidencePairs", []),
+            attributes=track.get("attributes", {}),
+        )
+
+    def exceeds_thresholds(self, thresholds: Dict[str, float]) -> bool:
+        """Same as Track.exceeds_thresholds"""
+        defaultThresh = thresholds.get('default', 0)
+        return any(
+            confidence >= thresholds.get(field, defaultThresh)
+            for field, confidence in self.confidencePairs
+        )
+
+    def feature_dict(self, index: int) -> Dict[str, Any]:
+        """The detection at index, as Feature.dict(exclude_none=True)"""
+        feature: Dict[str, Any] = {
+            "frame": int(self.frames[index]),
+            "bounds": self.bounds[index].tolist(),
+        }
+        for field in _SPARSE_FIELDS:
+            value = self.sparse[field].get(index)
+            if value is not None:
+                feature[field] = value
+        fishLength = self.fishLength[index]
+        if not np.isnan(fishLength):
+            feature["fishLength"] = float(fishLength)
+        for field, flags in (
+            ("interpolate", self.interpolate),
+            ("keyframe", self.keyframe),
+        ):
+            if flags[index] != _FLAG_ABSENT:
+                feature[field] = bool(flags[index])
+        return feature
+
+    def iter_feature_dicts(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self.feature_dict(index)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The track as Track.dict(exclude_none=True)"""
+        return {
+            "begin": self.begin,
+            "end": self.end,
+            "trackId": self.trackId,
+            "features": list(self.iter_feature_dicts()),
+            "confidencePairs": self.confidencePairs,
+            "attributes": self.attributes,
+        }
+
+
+class ColumnarTrackStore:
+    """All tracks of a result, keyed the same way as the track JSON."""
+
+    def __init__(self, tracks: Optional[Dict[Any, ColumnarTrack]] = None):
+        self.tracks: Dict[Any, ColumnarTrack] = tracks or {}
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def __iter__(self) -> Iterator[ColumnarTrack]:
+        return iter(self.tracks.values())
+
+    @property
+    def detection_count(self) -> int:
+        return sum(len(track) for track in self.tracks.values())
+
+    @classmethod
+    def from_track_dict(cls, track_dict: Dict[Any, dict]) -> 'ColumnarTrackStore':
+        return cls(
+            {key: ColumnarTrack.from_dict(track) for key, track in track_dict.items()}
+        )
+
+    def to_track_dict(self) -> Dict[Any, dict]:
+        return {key: track.to_dict() for key, track in self.tracks.items()}
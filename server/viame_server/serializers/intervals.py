@@ -0,0 +1,68 @@
+"""
+Frame-interval index over the tracks of a result, answering which tracks
+overlap a window of frames without visiting every track.
+"""
+import bisect
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class TrackIntervalIndex:
+    """Tracks sorted by their first frame, with their last frame alongside."""
+
+    __slots__ = ("keys", "begins", "ends")
+
+    def __init__(self, keys: List[Any], begins: np.ndarray, ends: np.ndarray):
+        self.keys = keys
+        self.begins = begins
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def nbytes(self) -> int:
+        # Rough size of the key list, which holds short strings
+        return self.begins.nbytes + self.ends.nbytes + 64 * len(self.keys)
+
+    @classmethod
+    def from_track_dict(cls, track_dict: Dict[Any, dict]) -> 'TrackIntervalIndex':
+        keys = list(track_dict.keys())
+        begins = np.array([t["begin"] for t in track_dict.values()], dtype=np.int64)
+        ends = np.array([t["end"] for t in track_dict.values()], dtype=np.int64)
+        order = np.argsort(begins, kind="stable")
+        return cls([keys[i] for i in order], begins[order], ends[order])
+
+    def overlapping(
+        self, frameStart: Optional[int] = None, frameEnd: Optional[int] = None
+    ) -> List[Any]:
+        """Keys of the tracks overlapping [frameStart, frameEnd], in begin order"""
+        stop = len(self.keys)
+        if frameEnd is not None:
+            stop = int(np.searchsorted(self.begins, frameEnd, side="right"))
+        if frameStart is None:
+            return self.keys[:stop]
+        (indices,) = np.nonzero(self.ends[:stop] >= frameStart)
+        return [self.keys[i] for i in indices]
+
+
+def trim_track(
+    track: Dict[str, Any],
+    frameStart: Optional[int] = None,
+    frameEnd: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    A copy of track with only the features in [frameStart, frameEnd], plus
+    the closest feature on either side so that spans crossing the window can
+    still be interpolated.  begin and end keep describing the whole track.
+    """
+    features = track.get("features", [])
+    frames = [feature["frame"] for feature in features]
+    start = 0
+    stop = len(features)
+    if frameStart is not None:
+        start = max(bisect.bisect_left(frames, frameStart) - 1, 0)
+    if frameEnd is not None:
+        stop = min(bisect.bisect_right(frames, frameEnd) + 1, len(features))
+    return {**track, "features": features[start:stop]}
@@ -11,7 +11,15 @@ from boiler.definitions import ActorType
 from boiler.serialization import kpf
 from girder.models.file import File
 
-from viame_server.serializers.models import Feature, Track
+from viame_server.serializers.models import (
+    CompactFeature,
+    CompactTrack,
+    coerce_attributes,
+    coerce_confidence_pairs,
+)
+
+# Confidence of an actor's type when no types yaml gave one
+DefaultActorConfidence = 1.0
 
 
 @dataclass
@@ -79,15 +87,13 @@ def load_kpf_as_tracks(ymls):
             print("WARNING: activity yaml was not given")
 
         tracks = parse_actor_map_to_tracks(actor_map)
-        return {
-            trackId: track.dict(exclude_none=True) for trackId, track in tracks.items()
-        }
+        return {trackId: track.to_dict() for trackId, track in tracks.items()}
     except Exception as e:
         error_report['error'] = str(e)
         return error_report
 
 
-def parse_actor_map_to_tracks(actor_map) -> Dict[int, Track]:
+def parse_actor_map_to_tracks(actor_map) -> Dict[int, CompactTrack]:
     tracks = {}
     ids = {}
     i = 1
@@ -95,23 +101,31 @@ def parse_actor_map_to_tracks(actor_map) -> Dict[int, Track]:
         actor = actor_map[actor_id]
         for detection in actor.detections:
             bounds = [
-                float(detection.box.left),
-                float(detection.box.bottom),
-                float(detection.box.right),
-                float(detection.box.top),
+                int(detection.box.left),
+                int(detection.box.bottom),
+                int(detection.box.right),
+                int(detection.box.top),
             ]
             feat_attributes = {
                 'timestamp': detection.timestamp,
                 'geom_id': detection.geom_id,
             }
-            feature = Feature(
-                frame=detection.frame, bounds=bounds, attributes=feat_attributes
+            feature = CompactFeature(
+                frame=int(detection.frame),
+                bounds=bounds,
+                attributes=coerce_attributes(feat_attributes),
             )
 
             # Create a new track per actor id
             if actor_id not in ids:
                 ids[actor_id] = i
-                confidence_pairs = [(actor.actor_type, actor.confidence)]
+                confidence = actor.confidence
+                if confidence is None:
+                    # Only the types yaml gives confidences, e.g. geom-only imports
+                    confidence = DefaultActorConfidence
+                confidence_pairs = coerce_confidence_pairs(
+                    [(actor.actor_type, confidence)]
+                )
                 track_attributes = {
                     'actor_id': actor_id,
                     'activity_id': actor.activity_id,
@@ -119,7 +133,7 @@ def parse_actor_map_to_tracks(actor_map) -> Dict[int, Track]:
                     'confidence': actor.activity_con,
                     'status': actor.src_status,
                 }
-                tracks[i] = Track(
+                tracks[i] = CompactTrack(
                     begin=actor.begin,
                     end=actor.end,
                     trackId=i,
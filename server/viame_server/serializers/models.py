@@ -1,5 +1,6 @@
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 from pydantic import BaseModel, Field
 
 
@@ -19,6 +20,21 @@ class GeoJSONFeatureCollection(BaseModel):
     type: str
     features: List[GeoJSONFeature]
 
+    @classmethod
+    def construct_trusted(cls, data: Dict[str, Any]) -> 'GeoJSONFeatureCollection':
+        """Build from already validated data, see Track.construct_trusted"""
+        return cls.construct(
+            type=data['type'],
+            features=[
+                GeoJSONFeature.construct(
+                    type=feature['type'],
+                    geometry=GeoJSONGeometry.construct(**feature['geometry']),
+                    properties=feature['properties'],
+                )
+                for feature in data['features']
+            ],
+        )
+
 
 class Feature(BaseModel):
     """Feature represents a single detection in a track."""
@@ -33,6 +49,19 @@ class Feature(BaseModel):
     interpolate: Optional[bool] = False
     keyframe: Optional[bool] = True
 
+    @classmethod
+    def construct_trusted(cls, data: Dict[str, Any]) -> 'Feature':
+        """Build from already validated data, see Track.construct_trusted"""
+        geometry = data.get('geometry')
+        if geometry is None:
+            return cls.construct(**data)
+        return cls.construct(
+            **{
+                **data,
+                'geometry': GeoJSONFeatureCollection.construct_trusted(geometry),
+            }
+        )
+
 
 class Track(BaseModel):
     begin: int
@@ -42,6 +71,25 @@ class Track(BaseModel):
     confidencePairs: List[Tuple[str, float]] = Field(default_factory=lambda: [])
     attributes: Dict[str, Any] = Field(default_factory=lambda: {})
 
+    @classmethod
+    def construct_trusted(cls, data: Dict[str, Any]) -> 'Track':
+        """
+        Build a Track, including its nested models, without validation.
+
+        Only use this for data the server produced itself from a validated
+        Track, such as a stored result file.  User-supplied tracks must go
+        through the regular constructor.
+        """
+        return cls.construct(
+            **{
+                **data,
+                'features': [
+                    Feature.construct_trusted(feature)
+                    for feature in data.get('features', [])
+                ],
+            }
+        )
+
     def exceeds_thresholds(self, thresholds: Dict[str, float]) -> bool:
         defaultThresh = thresholds.get('default', 0)
         return any(
@@ -52,22 +100,242 @@ class Track(BaseModel):
         )
 
 
+# The strings and numbers that Feature validation (pydantic) reads as a bool
+_BOOL_TRUE = {1, '1', 'on', 't', 'true', 'y', 'yes'}
+_BOOL_FALSE = {0, '0', 'off', 'f', 'false', 'n', 'no'}
+
+
+def coerce_attribute_value(value: Any) -> Union[bool, float, str]:
+    """
+    Coerce a detection attribute value exactly as validating a Feature would,
+    trying bool, then float, then str.  Raises ValueError for other values,
+    such as None.
+    """
+    if value is True or value is False:
+        return value
+    try:
+        lookup = value.lower() if isinstance(value, str) else value
+        if lookup in _BOOL_TRUE:
+            return True
+        if lookup in _BOOL_FALSE:
+            return False
+    except TypeError:
+        pass
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    if isinstance(value, str):
+        return value
+    raise ValueError(f'attribute value {value!r} is not a bool, number or string')
+
+
+def coerce_attributes(
+    attributes: Optional[Dict[str, Any]]
+) -> Optional[Dict[str, Union[bool, float, str]]]:
+    """Feature.attributes as validation would store them"""
+    if attributes is None:
+        return None
+    return {key: coerce_attribute_value(value) for key, value in attributes.items()}
+
+
+def coerce_confidence_pairs(pairs: Sequence[Sequence[Any]]) -> List[Tuple[str, float]]:
+    """
+    Track.confidencePairs as validation would store them.  Raises ValueError
+    for a missing confidence, which would break the confidence summaries.
+    """
+    coerced = []
+    for confidenceType, confidence in pairs:
+        if confidence is None:
+            raise ValueError(f'confidence of type {confidenceType!r} is missing')
+        coerced.append((str(confidenceType), float(confidence)))
+    return coerced
+
+
+class CompactFeature:
+    """
+    Lightweight equivalent of Feature for internal conversions.
+
+    Uses __slots__ and performs no validation, so callers must supply values
+    of the right types.  Convert with from_model()/to_model() at the
+    boundaries where validation matters, or coerce untrusted values with
+    coerce_attributes() and coerce_confidence_pairs().
+    """
+
+    __slots__ = (
+        "frame",
+        "bounds",
+        "attributes",
+        "geometry",
+        "head",
+        "tail",
+        "fishLength",
+        "interpolate",
+        "keyframe",
+    )
+
+    def __init__(
+        self,
+        frame: int,
+        bounds: List[int],
+        attributes: Optional[Dict[str, Union[bool, float, str]]] = None,
+        geometry: Optional[Dict[str, Any]] = None,
+        head: Optional[Tuple[float, float]] = None,
+        tail: Optional[Tuple[float, float]] = None,
+        fishLength: Optional[float] = None,
+        interpolate: Optional[bool] = False,
+        keyframe: Optional[bool] = True,
+    ):
+        self.frame = frame
+        self.bounds = bounds
+        self.attributes = attributes
+        self.geometry = geometry
+        self.head = head
+        self.tail = tail
+        self.fishLength = fishLength
+        self.interpolate = interpolate
+        self.keyframe = keyframe
+
+    @classmethod
+    def from_model(cls, feature: Feature) -> 'CompactFeature':
+        return cls(**feature.dict())
+
+    def to_model(self) -> Feature:
+        # Pass None values through, they may differ from the model's defaults
+        return Feature(**{field: getattr(self, field) for field in self.__slots__})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Equivalent of Feature.dict(exclude_none=True)"""
+        return {
+            field: value
+            for field, value in (
+                (field, getattr(self, field)) for field in self.__slots__
+            )
+            if value is not None
+        }
+
+
+class CompactTrack:
+    """Lightweight equivalent of Track, see CompactFeature"""
+
+    __slots__ = (
+        "begin",
+        "end",
+        "trackId",
+        "features",
+        "confidencePairs",
+        "attributes",
+    )
+
+    def __init__(
+        self,
+        begin: int,
+        end: int,
+        trackId: int,
+        features: Optional[List[CompactFeature]] = None,
+        confidencePairs: Optional[List[Tuple[str, float]]] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.begin = begin
+        self.end = end
+        self.trackId = trackId
+        self.features = features if features is not None else []
+        self.confidencePairs = confidencePairs if confidencePairs is not None else []
+        self.attributes = attributes if attributes is not None else {}
+
+    @classmethod
+    def from_model(cls, track: Track) -> 'CompactTrack':
+        return cls(
+            begin=track.begin,
+            end=track.end,
+            trackId=track.trackId,
+            features=[CompactFeature.from_model(f) for f in track.features],
+            confidencePairs=list(track.confidencePairs),
+            attributes=dict(track.attributes),
+        )
+
+    def to_model(self) -> Track:
+        return Track(
+            begin=self.begin,
+            end=self.end,
+            trackId=self.trackId,
+            features=[feature.to_model() for feature in self.features],
+            confidencePairs=self.confidencePairs,
+            attributes=self.attributes,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Equivalent of Track.dict(exclude_none=True)"""
+        return {
+            "begin": self.begin,
+            "end": self.end,
+            "trackId": self.trackId,
+            "features": [feature.to_dict() for feature in self.features],
+            "confidencePairs": self.confidencePairs,
+            "attributes": self.attributes,
+        }
+
+
+def interpolate_bounds(
+    a_bounds: Sequence[float],
+    b_bounds: Sequence[float],
+    frame_range: int,
+    start: int = 1,
+    stop: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Bounds of the in-between frames a.frame + [start, stop) of a keyframe pair
+    that is frame_range frames apart, as an integer array of shape
+    (stop - start, len(a_bounds)).  By default this covers the whole span.
+
+    Rounds exactly like the scalar computation in interpolate(): the same
+    float64 operations, then round-half-to-even.
+    """
+    if frame_range <= 0:
+        raise ValueError('b.frame must be larger than a.frame')
+    if stop is None:
+        stop = frame_range
+    delta = np.arange(start, stop, dtype=np.float64) / frame_range
+    inverse_delta = 1 - delta
+    bounds = np.multiply.outer(delta, np.asarray(a_bounds, dtype=np.float64))
+    bounds += np.multiply.outer(inverse_delta, np.asarray(b_bounds, dtype=np.float64))
+    return np.rint(bounds).astype(np.int64)
+
+
+def iter_interpolated(
+    a: Feature, b: Feature, block_size: int = 4096
+) -> Iterator[Tuple[int, List[int]]]:
+    """
+    Lazily yield (frame, bounds) for every frame in (a, b).
+
+    Bounds are computed block_size frames at a time, so memory use does not
+    depend on the length of the span.
+    """
+    return iter_interpolated_bounds(a.frame, a.bounds, b.frame, b.bounds, block_size)
+
+
+def iter_interpolated_bounds(
+    a_frame: int,
+    a_bounds: Sequence[float],
+    b_frame: int,
+    b_bounds: Sequence[float],
+    block_size: int = 4096,
+) -> Iterator[Tuple[int, List[int]]]:
+    """iter_interpolated() for a keyframe pair given as plain frames and bounds"""
+    frame_range = b_frame - a_frame
+    if frame_range <= 0:
+        raise ValueError('b.frame must be larger than a.frame')
+    for start in range(1, frame_range, block_size):
+        stop = min(start + block_size, frame_range)
+        block = interpolate_bounds(a_bounds, b_bounds, frame_range, start, stop)
+        yield from zip(range(a_frame + start, a_frame + stop), block.tolist())
+
+
 # interpolate all features [a, b)
 def interpolate(a: Feature, b: Feature) -> List[Feature]:
     if a.interpolate is False:
         raise ValueError('Cannot interpolate feature without interpolate enabled')
-    if b.frame <= a.frame:
-        raise ValueError('b.frame must be larger than a.frame')
     feature_list = [a]
-    frame_range = b.frame - a.frame
-    for frame in range(1, frame_range):
-        delta = frame / frame_range
-        inverse_delta = 1 - delta
-        bounds: List[float] = [
-            round((abox * delta) + (bbox * inverse_delta))
-            for (abox, bbox) in zip(a.bounds, b.bounds)
-        ]
-        feature_list.append(
-            Feature(frame=a.frame + frame, bounds=bounds, keyframe=False)
-        )
+    for frame, bounds in iter_interpolated(a, b):
+        feature_list.append(Feature(frame=frame, bounds=bounds, keyframe=False))
     return feature_list
@@ -1,14 +1,39 @@
 """
 VIAME Fish format deserializer
 """
+import atexit
 import csv
 import io
+import multiprocessing
+import os
 import re
-from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
-
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import numpy as np
 from girder.models.file import File
 
-from viame_server.serializers.models import Feature, Track, interpolate
+from viame_server.serializers.columnar import ColumnarTrack
+from viame_server.serializers.models import (
+    CompactFeature,
+    CompactTrack,
+    Track,
+    coerce_attributes,
+    iter_interpolated,
+    iter_interpolated_bounds,
+)
 
 
 def valueToString(value):
@@ -19,7 +44,14 @@ def valueToString(value):
     return str(value)
 
 
-def row_info(row: List[str]) -> Tuple[int, str, int, List[float], float]:
+# Trailing columns are dispatched on their "(tag)" prefix, so each column is
+# matched against at most one compiled expression
+_keypoint_regex = re.compile(r"^(head|tail) ([0-9]+\.*[0-9]*) ([0-9]+\.*[0-9]*)")
+_attribute_regex = re.compile(r"^(.*?)\s(.+)")
+_polygon_regex = re.compile(r"^((?:[0-9]+\.*[0-9]*\s*)+)")
+
+
+def row_info(row: List[str]) -> Tuple[int, str, int, List[int], float]:
     trackId = int(row[0])
     filename = str(row[1])
     frame = int(row[2])
@@ -42,38 +74,48 @@ def _deduceType(value: str) -> Union[bool, float, str]:
         return value
 
 
-def create_geoJSONFeature(features: Feature, type: str, coords: List[float], key=''):
-    feature = {}
-    if "geometry" not in features:
-        features["geometry"] = {"type": "FeatureCollection", "features": []}
-    else:  # check for existing type/key pairs
-        if features["geometry"]["features"]:
-            for subfeature in features["geometry"]["features"]:
-                if (
-                    subfeature["geometry"]["type"] == type
-                    and subfeature["properties"]["key"] == key
-                ):
-                    feature = subfeature
-                    break
-    if "geometry" not in feature:
-        feature = {
-            "type": "Feature",
-            "properties": {"key": key},
-            "geometry": {"type": type},
-        }
-    if "Polygon" == type:
-        feature["geometry"]['coordinates'] = [coords]
-    elif type in ["LineString", "Point"]:
-        feature['geometry']['coordinates'] = coords
+class GeometryBuilder:
+    """
+    Accumulates the GeoJSON features of a single detection.
 
-    features['geometry']['features'].append(feature)
+    Features are indexed by (geometry type, key), so repeating a pair replaces
+    the coordinates of the existing feature instead of appending a duplicate.
+    """
+
+    def __init__(self):
+        self._features: Dict[Tuple[str, str], dict] = {}
+
+    def add(self, type: str, coords: List, key: str = ''):
+        feature = self._features.get((type, key))
+        if feature is None:
+            feature = {
+                "type": "Feature",
+                "properties": {"key": key},
+                "geometry": {"type": type},
+            }
+            self._features[(type, key)] = feature
+        if "Polygon" == type:
+            feature["geometry"]['coordinates'] = [coords]
+        elif type in ["LineString", "Point"]:
+            feature['geometry']['coordinates'] = coords
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Keyword arguments for Feature, empty if no geometry was added"""
+        if not self._features:
+            return {}
+        return {
+            "geometry": {
+                "type": "FeatureCollection",
+                "features": list(self._features.values()),
+            }
+        }
 
 
 def _parse_row(row: List[str]) -> Tuple[Dict, Dict, Dict, List]:
     """
     parse a single CSV line into its composite track and detection parts
     """
-    features = {}
+    geometry = GeometryBuilder()
     attributes = {}
     track_attributes = {}
     confidence_pairs = [
@@ -81,76 +123,82 @@ def _parse_row(row: List[str]) -> Tuple[Dict, Dict, Dict, List]:
         for i in range(9, len(row), 2)
         if i + 1 < len(row) and row[i] and row[i + 1] and not row[i].startswith("(")
     ]
-    head_tail = []
+    head: Optional[List[float]] = None
+    tail: Optional[List[float]] = None
     start = 9 + len(confidence_pairs) * 2
 
     for j in range(start, len(row)):
-        head_regex = re.match(
-            r"^\(kp\) head ([0-9]+\.*[0-9]*) ([0-9]+\.*[0-9]*)", row[j]
-        )
-        if head_regex:
-            head_tail.insert(0, [float(head_regex[1]), float(head_regex[2])])
-            create_geoJSONFeature(features, 'Point', head_tail[0], 'head')
-        tail_regex = re.match(
-            r"^\(kp\) tail ([0-9]+\.*[0-9]*) ([0-9]+\.*[0-9]*)", row[j]
-        )
-        if tail_regex:
-            head_tail.insert(1, [float(tail_regex[1]), float(tail_regex[2])])
-            create_geoJSONFeature(
-                features, 'Point', head_tail[len(head_tail) - 1], 'tail'
-            )
-        atr_regex = re.match(r"^\(atr\) (.*?)\s(.+)", row[j])
-        if atr_regex:
-            attributes[atr_regex[1]] = _deduceType(atr_regex[2])
-        trk_regex = re.match(r"^\(trk-atr\) (.*?)\s(.+)", row[j])
-        if trk_regex:
-            track_attributes[trk_regex[1]] = _deduceType(trk_regex[2])
-        poly_regex = re.match(r"^(\(poly\)) ((?:[0-9]+\.*[0-9]*\s*)+)", row[j])
-        if poly_regex:
-            temp = [float(x) for x in poly_regex[2].split()]
-            coords = list(zip(temp[::2], temp[1::2]))
-            create_geoJSONFeature(features, 'Polygon', coords)
-
-    if len(head_tail) == 2:
-        create_geoJSONFeature(features, 'LineString', head_tail, 'HeadTails')
-    return features, attributes, track_attributes, confidence_pairs
-
-
-def _parse_row_for_tracks(row: List[str]) -> Tuple[Feature, Dict, Dict, List]:
+        column = row[j]
+        if not column.startswith("("):
+            continue
+        tag, _, value = column.partition(" ")
+        if tag == "(kp)":
+            kp_regex = _keypoint_regex.match(value)
+            if kp_regex is None:
+                continue
+            point = [float(kp_regex[2]), float(kp_regex[3])]
+            if kp_regex[1] == "head":
+                head = point
+            else:
+                tail = point
+            geometry.add('Point', point, kp_regex[1])
+        elif tag == "(atr)":
+            atr_regex = _attribute_regex.match(value)
+            if atr_regex:
+                attributes[atr_regex[1]] = _deduceType(atr_regex[2])
+        elif tag == "(trk-atr)":
+            trk_regex = _attribute_regex.match(value)
+            if trk_regex:
+                track_attributes[trk_regex[1]] = _deduceType(trk_regex[2])
+        elif tag == "(poly)":
+            poly_regex = _polygon_regex.match(value)
+            if poly_regex:
+                temp = [float(x) for x in poly_regex[1].split()]
+                coords = [[x, y] for x, y in zip(temp[::2], temp[1::2])]
+                geometry.add('Polygon', coords)
+
+    if head and tail:
+        geometry.add('LineString', [head, tail], 'HeadTails')
+    return geometry.to_dict(), attributes, track_attributes, confidence_pairs
+
+
+def _parse_row_for_tracks(row: List[str]) -> Tuple[int, CompactFeature, Dict, List]:
+    """
+    parse a single CSV line into its trackId, detection, track attributes
+    and confidence pairs, reading each column exactly once
+    """
     head_tail_feature, attributes, track_attributes, confidence_pairs = _parse_row(row)
-    trackId, filename, frame, bounds, fishLength = row_info(row)
+    trackId, _, frame, bounds, fishLength = row_info(row)
 
-    feature = Feature(
+    feature = CompactFeature(
         frame=frame,
         bounds=bounds,
-        attributes=attributes or None,
+        attributes=coerce_attributes(attributes) if attributes else None,
         fishLength=fishLength if fishLength > 0 else None,
         **head_tail_feature,
     )
 
-    # Pass the rest of the unchanged info through as well
-    return feature, attributes, track_attributes, confidence_pairs
+    return trackId, feature, track_attributes, confidence_pairs
 
 
-def load_csv_as_tracks(rows: List[str]) -> Dict[str, dict]:
+def load_csv_as_tracks(rows: Iterable[str]) -> Dict[str, dict]:
     """
     Convert VIAME web CSV to json tracks.
     Expect detections to be in increasing order (either globally or by track).
+
+    rows may be any iterable of lines, including a lazy stream, so the raw
+    CSV never needs to be held in memory.
     """
     reader = csv.reader(row for row in rows if (not row.startswith("#") and row))
-    tracks: Dict[int, Track] = {}
+    tracks: Dict[int, CompactTrack] = {}
     for row in reader:
-        (
-            feature,
-            attributes,
-            track_attributes,
-            confidence_pairs,
-        ) = _parse_row_for_tracks(row)
-
-        trackId, _, frame, _, _ = row_info(row)
+        trackId, feature, track_attributes, confidence_pairs = _parse_row_for_tracks(
+            row
+        )
+        frame = feature.frame
 
         if trackId not in tracks:
-            tracks[trackId] = Track(begin=frame, end=frame, trackId=trackId)
+            tracks[trackId] = CompactTrack(begin=frame, end=frame, trackId=trackId)
 
         track = tracks[trackId]
         track.begin = min(frame, track.begin)
@@ -161,82 +209,289 @@ def load_csv_as_tracks(rows: List[str]) -> Dict[str, dict]:
         for (key, val) in track_attributes.items():
             track.attributes[key] = val
 
-    return {trackId: track.dict(exclude_none=True) for trackId, track in tracks.items()}
+    # Release each track as it is converted so both forms never coexist in full
+    return {trackId: tracks.pop(trackId).to_dict() for trackId in list(tracks.keys())}
 
 
-def export_tracks_as_csv(
-    track_dict, excludeBelowThreshold=False, thresholds={}, filenames=None
-) -> str:
-    """Export track json to a CSV format."""
-    csvFile = io.StringIO()
-    writer = csv.writer(csvFile)
-    for t in track_dict.values():
-        track = Track(**t)
-        if (not excludeBelowThreshold) or track.exceeds_thresholds(thresholds):
+def _csv_chunk_offsets(path: str, chunks: int) -> List[int]:
+    """
+    Split a file into at most `chunks` byte ranges that start on line boundaries.
+    """
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, "rb") as f:
+        for i in range(1, chunks):
+            # Reading from one byte early lands exactly on a boundary if one is there
+            f.seek(max(size * i // chunks - 1, offsets[-1]))
+            f.readline()
+            if f.tell() >= size:
+                break
+            if f.tell() > offsets[-1]:
+                offsets.append(f.tell())
+    offsets.append(size)
+    return offsets
+
+
+def _load_csv_range_as_tracks(path: str, start: int, end: int) -> Dict[int, dict]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return load_csv_as_tracks(data.decode("utf-8").splitlines())
+
+
+def merge_track_dicts(partials: Iterable[Dict[int, dict]]) -> Dict[int, dict]:
+    """
+    Merge track dicts parsed from consecutive pieces of one CSV, in file order.
+    The result is identical to parsing the whole file with load_csv_as_tracks.
+    """
+    merged: Dict[int, dict] = {}
+    for partial in partials:
+        for trackId, track in partial.items():
+            existing = merged.get(trackId)
+            if existing is None:
+                merged[trackId] = track
+                continue
+            existing["begin"] = min(existing["begin"], track["begin"])
+            existing["end"] = max(existing["end"], track["end"])
+            existing["features"].extend(track["features"])
+            # confidencePairs come from the last row of a track
+            existing["confidencePairs"] = track["confidencePairs"]
+            existing["attributes"].update(track["attributes"])
+    return merged
+
+
+# Worker pools shared by all conversions, by number of processes.  Workers are
+# spawned rather than forked, since the server process runs several threads.
+_csv_pools: Dict[int, ProcessPoolExecutor] = {}
+_csv_pools_lock = threading.Lock()
+
+
+def _shutdown_csv_pools():
+    with _csv_pools_lock:
+        pools = list(_csv_pools.values())
+        _csv_pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+
+atexit.register(_shutdown_csv_pools)
+
+
+def _csv_pool(processes: int) -> ProcessPoolExecutor:
+    with _csv_pools_lock:
+        pool = _csv_pools.get(processes)
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _csv_pools[processes] = pool
+        return pool
+
+
+def load_csv_file_as_tracks_parallel(
+    path: str, processes: Optional[int] = None, chunks: Optional[int] = None
+) -> Dict[int, dict]:
+    """
+    Convert a VIAME web CSV on local disk to json tracks using a process pool.
+
+    The file is split into byte ranges on line boundaries, each range is parsed
+    by load_csv_as_tracks in a worker process, and the partial results are
+    merged in file order.  Quoted fields spanning multiple lines are not
+    supported, which VIAME CSV never produces.
+
+    Worker processes are started on first use and shared by later and
+    concurrent conversions asking for the same number of processes.
+    """
+    processes = processes or os.cpu_count() or 1
+    offsets = _csv_chunk_offsets(path, chunks or processes)
+    if len(offsets) <= 2 or processes == 1:
+        return merge_track_dicts(
+            _load_csv_range_as_tracks(path, start, end)
+            for start, end in zip(offsets[:-1], offsets[1:])
+        )
+    return merge_track_dicts(
+        _csv_pool(processes).map(
+            _load_csv_range_as_tracks,
+            [path] * (len(offsets) - 1),
+            offsets[:-1],
+            offsets[1:],
+        )
+    )
 
-            sorted_confidence_pairs = sorted(
-                track.confidencePairs, key=lambda item: item[1]
+
+def _attribute_columns(attributes: Optional[Mapping[str, Any]]) -> List[str]:
+    if not attributes:
+        return []
+    return [f"(atr) {key} {valueToString(val)}" for key, val in attributes.items()]
+
+
+def _geometry_columns(geometry: Optional[Mapping[str, Any]]) -> List[str]:
+    """Columns of a feature's geometry, given as GeoJSONFeatureCollection json"""
+    columns: List[str] = []
+    if not geometry or "FeatureCollection" != geometry["type"]:
+        return columns
+    for geoJSONFeature in geometry["features"]:
+        geoJSONGeometry = geoJSONFeature["geometry"]
+        if 'Polygon' == geoJSONGeometry["type"]:
+            # Coordinates need to be flattened out from their list of tuples
+            coordinates = [
+                item
+                for sublist in geoJSONGeometry["coordinates"][0]
+                for item in sublist
+            ]
+            columns.append(
+                f"(poly) {' '.join(map(lambda x: str(round(x)), coordinates))}"
+            )
+        if 'Point' == geoJSONGeometry["type"]:
+            coordinates = geoJSONGeometry["coordinates"]
+            columns.append(
+                f"(kp) {geoJSONFeature['properties']['key']} {round(coordinates[0])} {round(coordinates[1])}"
             )
+        # TODO: support for multiple GeoJSON Objects of the same type once the CSV supports it
+    return columns
+
+
+def _confidence_columns(track: Union[Track, ColumnarTrack]) -> Tuple[float, List[Any]]:
+    """The track's highest confidence and its flattened, sorted confidence pairs"""
+    sorted_confidence_pairs = sorted(track.confidencePairs, key=lambda item: item[1])
+    confidence = sorted_confidence_pairs[-1][1]
+    return confidence, [item for pair in sorted_confidence_pairs for item in pair]
+
+
+def _track_attribute_columns(track: Union[Track, ColumnarTrack]) -> List[str]:
+    return [
+        f"(trk-atr) {key} {valueToString(val)}" for key, val in track.attributes.items()
+    ]
+
+
+def _track_rows(track: Track, filenames: List[str]) -> Iterator[List[Any]]:
+    """CSV rows of a single track, with interpolated frames expanded"""
+    if not track.features:
+        return
+    confidence, pair_columns = _confidence_columns(track)
+    track_columns = _track_attribute_columns(track)
+
+    for index, keyframe in enumerate(track.features):
+        frame = keyframe.frame
+        yield [
+            track.trackId,
+            filenames[frame] if frame < len(filenames) else "",
+            frame,
+            *keyframe.bounds,
+            confidence,
+            keyframe.fishLength or -1,
+            *pair_columns,
+            *_attribute_columns(keyframe.attributes),
+            *track_columns,
+            *_geometry_columns(keyframe.geometry and keyframe.geometry.dict()),
+        ]
+
+        # If this is not the last keyframe, and interpolation is
+        # enabled for this keyframe, interpolate all features in (a,b)
+        if keyframe.interpolate and index < len(track.features) - 1:
+            nextKeyframe = track.features[index + 1]
+            for frame, frame_bounds in iter_interpolated(keyframe, nextKeyframe):
+                yield [
+                    track.trackId,
+                    filenames[frame] if frame < len(filenames) else "",
+                    frame,
+                    *frame_bounds,
+                    confidence,
+                    -1,
+                    *pair_columns,
+                    *track_columns,
+                ]
+
+
+def _columnar_track_rows(
+    track: ColumnarTrack, filenames: List[str]
+) -> Iterator[List[Any]]:
+    """_track_rows() for a ColumnarTrack, reading the detection columns directly"""
+    if not len(track):
+        return
+    confidence, pair_columns = _confidence_columns(track)
+    track_columns = _track_attribute_columns(track)
+    attributes = track.sparse["attributes"]
+    geometry = track.sparse["geometry"]
+    frames = track.frames.tolist()
+    bounds = track.bounds.tolist()
+    # NaN marks an absent fishLength, which is written as -1 like None and 0
+    fishLength = [
+        None if np.isnan(value) else value for value in track.fishLength.tolist()
+    ]
+    interpolate = (track.interpolate == 1).tolist()
+
+    for index, frame in enumerate(frames):
+        yield [
+            track.trackId,
+            filenames[frame] if frame < len(filenames) else "",
+            frame,
+            *bounds[index],
+            confidence,
+            fishLength[index] or -1,
+            *pair_columns,
+            *_attribute_columns(attributes.get(index)),
+            *track_columns,
+            *_geometry_columns(geometry.get(index)),
+        ]
+
+        if interpolate[index] and index < len(frames) - 1:
+            for frame, frame_bounds in iter_interpolated_bounds(
+                frame, bounds[index], frames[index + 1], bounds[index + 1]
+            ):
+                yield [
+                    track.trackId,
+                    filenames[frame] if frame < len(filenames) else "",
+                    frame,
+                    *frame_bounds,
+                    confidence,
+                    -1,
+                    *pair_columns,
+                    *track_columns,
+                ]
 
-            for index, keyframe in enumerate(track.features):
-                features = [keyframe]
-
-                # If this is not the last keyframe, and interpolation is
-                # enabled for this keyframe, interpolate
-                if keyframe.interpolate and index < len(track.features) - 1:
-                    nextKeyframe = track.features[index + 1]
-                    # interpolate all features in [a,b)
-                    features = interpolate(keyframe, nextKeyframe)
-
-                for feature in features:
-                    columns = [
-                        track.trackId,
-                        "",
-                        feature.frame,
-                        *feature.bounds,
-                        sorted_confidence_pairs[-1][1],
-                        feature.fishLength or -1,
-                    ]
-
-                    if filenames and feature.frame < len(filenames):
-                        columns[1] = filenames[feature.frame]
-
-                    for pair in sorted_confidence_pairs:
-                        columns.extend(list(pair))
-
-                    if feature.attributes:
-                        for key, val in feature.attributes.items():
-                            columns.append(f"(atr) {key} {valueToString(val)}")
-
-                    if track.attributes:
-                        for key, val in track.attributes.items():
-                            columns.append(f"(trk-atr) {key} {valueToString(val)}")
-
-                    if (
-                        feature.geometry
-                        and "FeatureCollection" == feature.geometry.type
-                    ):
-                        for geoJSONFeature in feature.geometry.features:
-                            if 'Polygon' == geoJSONFeature.geometry.type:
-                                # Coordinates need to be flattened out from their list of tuples
-                                coordinates = [
-                                    item
-                                    for sublist in geoJSONFeature.geometry.coordinates[
-                                        0
-                                    ]
-                                    for item in sublist
-                                ]
-                                columns.append(
-                                    f"(poly) {' '.join(map(lambda x: str(round(x)), coordinates))}"
-                                )
-                            if 'Point' == geoJSONFeature.geometry.type:
-                                coordinates = geoJSONFeature.geometry.coordinates
-                                columns.append(
-                                    f"(kp) {geoJSONFeature.properties['key']} {round(coordinates[0])} {round(coordinates[1])}"
-                                )
-                            # TODO: support for multiple GeoJSON Objects of the same type once the CSV supports it
-
-                    writer.writerow(columns)
-                    yield csvFile.getvalue()
-                    csvFile.seek(0)
-                    csvFile.truncate(0)
+
+def export_tracks_as_csv(
+    track_dict,
+    excludeBelowThreshold=False,
+    thresholds={},
+    filenames=None,
+    chunk_size=64 * 1024,
+    trusted=False,
+    passing: Optional[Set[str]] = None,
+) -> Iterator[str]:
+    """
+    Export track json to a CSV format.
+
+    Rows are buffered and yielded in chunks of at least chunk_size characters
+    (except for the last one), so the consumer sees few, large writes.
+
+    Set trusted for track json the server wrote itself (a stored result), to
+    skip re-validating every track and feature.  Trusted tracks are read into
+    a ColumnarTrack rather than a Track, so no object is built per detection.
+
+    When excluding tracks below threshold, passing may give the keys of the
+    tracks known to pass (from a confidence summary), so the confidence pairs
+    do not need to be checked again.
+    """
+    csvFile = io.StringIO()
+    writer = csv.writer(csvFile)
+    for key, t in track_dict.items():
+        if excludeBelowThreshold and passing is not None and str(key) not in passing:
+            continue
+        track = ColumnarTrack.from_dict(t) if trusted else Track(**t)
+        if excludeBelowThreshold and passing is None:
+            if not track.exceeds_thresholds(thresholds):
+                continue
+
+        rows = _columnar_track_rows if trusted else _track_rows
+        for columns in rows(track, filenames or []):
+            writer.writerow(columns)
+            if csvFile.tell() >= chunk_size:
+                yield csvFile.getvalue()
+                csvFile.seek(0)
+                csvFile.truncate(0)
+
+    if csvFile.tell():
+        yield csvFile.getvalue()
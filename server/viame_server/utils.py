@@ -1,17 +1,39 @@
+import codecs
+import email.utils
+import hashlib
 import io
 import json
+import os
 import re
-from datetime import datetime
-from typing import Dict
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import cherrypy
+from bson.objectid import ObjectId
 from girder.api.rest import setContentDisposition, setRawResponse, setResponseHeader
+from girder.constants import AccessType
+from girder.exceptions import FilePathException, RestException
 from girder.models.file import File
 from girder.models.folder import Folder
 from girder.models.item import Item
 from girder.models.upload import Upload
+from pymongo import ReturnDocument
 
-from viame_server.serializers import viame
+from viame_server.cache import ResultCache
+from viame_server.compression import (
+    EncodingExtensions,
+    available_encodings,
+    compressing_writer,
+    decompress_chunks,
+    file_encoding,
+)
+from viame_server.export_cache import ExportCache
+from viame_server.model.confidence_summary import ConfidenceSummary
+from viame_server.model.track import ResultTrack
+from viame_server.retention import schedule_pruning
+from viame_server.serializers import binary, models, viame
+from viame_server.serializers.intervals import TrackIntervalIndex
 
 ImageSequenceType = "image-sequence"
 VideoType = "video"
@@ -46,6 +68,69 @@ VideoMimeTypes = {
     "video/x-msvideo",
 }
 
+# CSV results at least this large are converted by a process pool when the
+# assetstore exposes them as a local file
+parallelCsvMinBytes = int(os.environ.get("VIAME_PARALLEL_CSV_MIN_BYTES", 64 * 2**20))
+
+# Parsed result files, bounded by an estimate of the memory their tracks hold
+trackDataCache = ResultCache(
+    int(os.environ.get("VIAME_TRACK_CACHE_BYTES", 256 * 2**20)),
+    os.environ.get("VIAME_TRACK_CACHE_POLICY", "lru"),
+)
+
+# Frame-interval indexes of results, for frame-window queries
+trackIntervalCache = ResultCache(
+    int(os.environ.get("VIAME_INTERVAL_CACHE_BYTES", 32 * 2**20))
+)
+
+# Edits are appended to the current result as delta files, which are folded
+# into a new result once there are too many of them or they grow too large
+deltaSaves = os.environ.get("VIAME_DELTA_SAVES", "true").lower() == "true"
+deltaMaxCount = int(os.environ.get("VIAME_DELTA_MAX_COUNT", 50))
+deltaMaxBytes = int(os.environ.get("VIAME_DELTA_MAX_BYTES", 16 * 2**20))
+deltaFilePrefix = "delta_"
+
+# Where edits to the current result are stored: "file" keeps them in the
+# result item, "track" in the ResultTrack collection, one document per track
+resultBackend = os.environ.get("VIAME_RESULT_BACKEND", "file")
+
+# Content-coding of stored result files: "gzip", "zstd" when zstandard is
+# installed (falling back to gzip otherwise), or "identity" for plain JSON
+resultEncoding = os.environ.get("VIAME_RESULT_ENCODING", "gzip")
+if resultEncoding != "identity" and resultEncoding not in available_encodings():
+    resultEncoding = "gzip"
+
+# Format of stored result files: "json", or "msgpack" when msgpack is
+# installed.  Folders may override it with their resultFormat metadata
+resultFormat = os.environ.get("VIAME_RESULT_FORMAT", "json")
+
+# Results are encoded into a temporary file for upload, which stays in memory
+# up to this size and spills to disk beyond it
+uploadSpoolBytes = int(os.environ.get("VIAME_UPLOAD_SPOOL_BYTES", 8 * 2**20))
+
+# Result history kept in auxiliary folders: the newest results, plus the newest
+# result of each checkpoint period before them.  Pruning is scheduled after a
+# save once the history has grown past that by another retentionKeep results
+retentionKeep = int(os.environ.get("VIAME_RETENTION_KEEP", 20))
+retentionCheckpointHours = int(os.environ.get("VIAME_RETENTION_CHECKPOINT_HOURS", 24))
+retentionMaxCheckpoints = int(os.environ.get("VIAME_RETENTION_MAX_CHECKPOINTS", 30))
+retentionAuto = os.environ.get("VIAME_RETENTION_AUTO", "true").lower() == "true"
+
+# Generated CSV exports, kept on local disk up to this total size
+exportCache = ExportCache(
+    os.environ.get(
+        "VIAME_EXPORT_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "viame_export_cache"),
+    ),
+    int(os.environ.get("VIAME_EXPORT_CACHE_BYTES", 2**30)),
+)
+
+# Cache-Control of responses validated by an ETag.  Every reuse is revalidated,
+# so a fronting proxy may share them by setting "public, no-cache" instead
+validatedCacheControl = os.environ.get(
+    "VIAME_VALIDATED_CACHE_CONTROL", "private, no-cache"
+)
+
 # Ad hoc way to guess the FPS of an Image Sequence based on file names
 # Currently not being used, can only be used once you know that all items
 # have been imported.
@@ -81,47 +166,555 @@ def get_or_create_auxiliary_folder(folder, user):
 
 
 def move_existing_result_to_auxiliary_folder(folder, user):
+    """
+    Move every result item of a folder to its auxiliary folder with a single
+    update, adjusting the size of both folders once.
+    """
     auxiliary = get_or_create_auxiliary_folder(folder, user)
 
-    existingResultItems = Item().find(
-        {"meta.detection": str(folder["_id"]), "folderId": folder["_id"]}
+    # Edits of a result backed by the ResultTrack collection are only stored
+    # there, and the collection only backs the current result
+    edited = Item().findOne(
+        {
+            "folderId": folder["_id"],
+            "meta.detection": str(folder["_id"]),
+            "meta.trackBackend": True,
+            "meta.resultHash": {"$exists": False},
+        }
+    )
+    if edited is not None:
+        writeBackTrackBackendItem(folder, edited, user)
+
+    existingResultItems = list(
+        Item().find(
+            {"folderId": folder["_id"], "meta.detection": str(folder["_id"])},
+            fields={"size": True},
+        )
+    )
+    if not existingResultItems:
+        return auxiliary
+    Item().update(
+        {"_id": {"$in": [item["_id"] for item in existingResultItems]}},
+        {
+            "$set": {
+                "folderId": auxiliary["_id"],
+                "baseParentType": auxiliary["baseParentType"],
+                "baseParentId": auxiliary["baseParentId"],
+            },
+            # Only the current result is backed by the folder's ResultTrack documents
+            "$unset": {"meta.trackBackend": ""},
+        },
+    )
+    # The auxiliary folder shares the base parent of the folder, whose size is
+    # unchanged, so only the two folders need updating
+    size = sum(item.get("size", 0) for item in existingResultItems)
+    if size:
+        Folder().increment({"_id": folder["_id"]}, "size", -size, multi=False)
+        Folder().increment({"_id": auxiliary["_id"]}, "size", size, multi=False)
+    return auxiliary
+
+
+def getCurrentResultItem(folder, user=None) -> Optional[Item]:
+    """
+    The latest result item of a folder, found through a sorted query limited to
+    one item.  Results created within the same millisecond may sort either
+    way, so the folder's currentResult pointer, set by saveTracks, wins over
+    the sorted hit when it designates a result of the folder created no
+    earlier.  With user, the latest result that user can read is returned
+    instead.
+    """
+    folderId = str(folder["_id"])
+    item = Item().findOne({"meta.detection": folderId}, sort=[("created", -1)])
+    pointer = folder.get("meta", {}).get("currentResult")
+    if pointer and item is not None and str(item["_id"]) != pointer:
+        pointed = Item().load(pointer, force=True)
+        if (
+            pointed is not None
+            and pointed["folderId"] == folder["_id"]
+            and pointed.get("meta", {}).get("detection") == folderId
+            and pointed["created"] >= item["created"]
+        ):
+            item = pointed
+    if item is None or user is None:
+        return item
+    if Item().hasAccess(item, user, AccessType.READ):
+        return item
+    readable = Item().findWithPermissions(
+        {"meta.detection": folderId}, sort=[("created", -1)], user=user, limit=1
+    )
+    return next(iter(readable), None)
+
+
+def pruneResultHistory(folder, user):
+    """Schedule a job removing the result history that is not retained"""
+    return schedule_pruning(
+        folder,
+        user,
+        retentionKeep,
+        retentionCheckpointHours * 3600,
+        retentionMaxCheckpoints,
     )
-    for item in existingResultItems:
-        Item().move(item, auxiliary)
 
 
 def itemIsWebsafeVideo(item: Item) -> bool:
     return item.get("meta", {}).get("codec") == "h264"
 
 
+def iterFileLines(file: File) -> Iterator[str]:
+    """
+    Stream the lines of a text file as it is downloaded, without ever holding
+    more than a single chunk of it in memory.  Line endings are handled the
+    same way as str.splitlines().
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    remainder = ""
+    for chunk in File().download(file, headers=False)():
+        lines = (remainder + decoder.decode(chunk)).splitlines(True)
+        # The last line may be incomplete, or a "\r" whose "\n" is in the next chunk
+        remainder = lines.pop() if lines else ""
+        for line in lines:
+            yield line[:-2] if line.endswith("\r\n") else line[:-1]
+    yield from (remainder + decoder.decode(b"", final=True)).splitlines()
+
+
+def fileCacheKey(file: File) -> Tuple[str, str]:
+    """Identify a file's content by its id and its hash, or its timestamp"""
+    stamp = file.get("sha512") or file.get("updated") or file.get("created")
+    return str(file["_id"]), str(stamp)
+
+
+def resultVersion(item: Item, base=None, deltas=None) -> str:
+    """
+    A strong validator of the tracks of a result item.  Edits that are not
+    stored as files update the item, so its updated time is part of it.
+    """
+    if base is None:
+        base, deltas = getResultFiles(item)
+    parts = [str(item["_id"]), str(item.get("updated"))]
+    parts.extend(":".join(fileCacheKey(f)) for f in [base, *deltas] if f is not None)
+    return hashlib.sha1("/".join(parts).encode()).hexdigest()
+
+
+def conditionalResponse(etag: str, lastModified: Optional[datetime] = None) -> bool:
+    """
+    Set the validators and Cache-Control of a response.  Returns True, after
+    setting a raw 304 response, when the request's validators match.
+    """
+    etag = f'"{etag}"'
+    setResponseHeader("ETag", etag)
+    setResponseHeader("Cache-Control", validatedCacheControl)
+    if lastModified is not None:
+        lastModified = lastModified.replace(microsecond=0, tzinfo=timezone.utc)
+        setResponseHeader(
+            "Last-Modified", email.utils.format_datetime(lastModified, usegmt=True)
+        )
+    headers = cherrypy.request.headers
+    notModified = False
+    if "If-None-Match" in headers:
+        tags = [tag.strip() for tag in headers["If-None-Match"].split(",")]
+        notModified = "*" in tags or etag in tags or f"W/{etag}" in tags
+    elif "If-Modified-Since" in headers and lastModified is not None:
+        try:
+            since = email.utils.parsedate_to_datetime(headers["If-Modified-Since"])
+            notModified = lastModified <= since
+        except (TypeError, ValueError):
+            pass
+    if notModified:
+        setRawResponse()
+        cherrypy.response.status = 304
+    return notModified
+
+
+# Memory held by parsed tracks per byte of decoded result, measured on
+# synthetic results and rounded up
+parsedSizeFactors = {"json": 6, "msgpack": 9, "csv": 4}
+
+
+def parsedSize(file: File, size: int) -> int:
+    """Estimated memory held by the parsed tracks of size decoded bytes of file"""
+    return size * parsedSizeFactors[resultFileFormat(file)]
+
+
 def getTrackData(file: File) -> Dict[str, dict]:
+    """
+    Load the tracks of a result file, through trackDataCache.
+
+    The returned dict is a shallow copy of the cached one: callers may add or
+    remove tracks, but the track dicts themselves are shared with the cache
+    and must never be modified in place.  Build a modified copy instead, as
+    trim_track does.
+    """
     if file is None:
         return {}
+    key = fileCacheKey(file)
+    tracks = trackDataCache.get(key)
+    if tracks is None:
+        tracks, size = _readTrackData(file)
+        trackDataCache.put(key, tracks, parsedSize(file, size))
+    return dict(tracks)
+
+
+def folderResultFormat(folder) -> str:
+    """The format new results of a folder are stored in"""
+    format = folder.get("meta", {}).get("resultFormat", resultFormat)
+    return "msgpack" if format == "msgpack" and binary.msgpack_available() else "json"
+
+
+def resultFileFormat(file: File) -> str:
+    """The format of a result file: "csv", "msgpack" or "json" """
     if "csv" in file["exts"]:
-        return viame.load_csv_as_tracks(
-            b"".join(list(File().download(file, headers=False)()))
-            .decode("utf-8")
-            .splitlines()
+        return "csv"
+    if "msgpack" in file["exts"]:
+        return "msgpack"
+    return "json"
+
+
+def _readTrackData(file: File) -> Tuple[Dict[str, dict], int]:
+    """The tracks of a result file, and the size of its decoded content"""
+    size = file.get("size", 0)
+    format = resultFileFormat(file)
+    if format == "csv":
+        path = None
+        if file.get("size", 0) >= parallelCsvMinBytes:
+            try:
+                path = File().getLocalFilePath(file)
+            except FilePathException:
+                pass
+        if path:
+            tracks = viame.load_csv_file_as_tracks_parallel(path)
+        else:
+            tracks = viame.load_csv_as_tracks(iterFileLines(file))
+        # Keyed by string, as results stored as json or msgpack are
+        return {str(key): track for key, track in tracks.items()}, size
+    chunks = File().download(file, headers=False)()
+    encoding = file_encoding(file["name"])
+    if encoding is not None:
+        chunks = decompress_chunks(chunks, encoding)
+    data = b"".join(list(chunks))
+    return _decodeTracks(data, format), len(data)
+
+
+def _decodeTracks(data: bytes, format: str) -> Dict[str, dict]:
+    if format == "msgpack":
+        return binary.loads(data)
+    return json.loads(data.decode())
+
+
+def getResultFiles(item: Item) -> Tuple[Optional[File], List[File]]:
+    """The base file of a result item and its delta files, in the order to apply"""
+    base = None
+    deltas = []
+    for file in Item().childFiles(item, sort=[("_id", 1)]):
+        if file["name"].startswith(deltaFilePrefix):
+            deltas.append(file)
+        elif base is None:
+            base = file
+    deltas.sort(key=lambda f: f["name"])
+    return base, deltas
+
+
+def applyDelta(tracks: Dict[str, dict], delta: Dict[str, Any]):
+    for track_id in delta.get("delete", []):
+        tracks.pop(str(track_id), None)
+    for track_id, track in delta.get("upsert", {}).items():
+        tracks[str(track_id)] = track
+
+
+def isTrackBackendItem(item: Item) -> bool:
+    return bool(item.get("meta", {}).get("trackBackend"))
+
+
+def loadResultTracks(item: Optional[Item], **kwargs) -> Dict[str, dict]:
+    """
+    Load the tracks of a result item, replaying its deltas on top of its base
+    file.  The same restrictions as getTrackData apply to the returned dict.
+
+    Results backed by the ResultTrack collection are read from it instead,
+    and kwargs are passed on to ResultTrack.findForFolder.
+    """
+    if item is None:
+        return {}
+    if isTrackBackendItem(item):
+        folder = {"_id": ObjectId(item["meta"]["detection"])}
+        return ResultTrack().trackDict(folder, **kwargs)
+    return _loadFileTracks(*getResultFiles(item))
+
+
+def _loadFileTracks(base: Optional[File], deltas: List[File]) -> Dict[str, dict]:
+    tracks = getTrackData(base)
+    for file in deltas:
+        applyDelta(tracks, getTrackData(file))
+    return tracks
+
+
+def loadResultTracksInWindow(
+    item: Optional[Item], frameStart: Optional[int], frameEnd: Optional[int]
+) -> Dict[str, dict]:
+    """
+    Load the tracks of a result item that overlap [frameStart, frameEnd],
+    either bound being optional, through an index cached per result version.
+    """
+    if item is None:
+        return {}
+    if isTrackBackendItem(item):
+        return loadResultTracks(item, frameStart=frameStart, frameEnd=frameEnd)
+    base, deltas = getResultFiles(item)
+    tracks = _loadFileTracks(base, deltas)
+    key = tuple(fileCacheKey(file) for file in [base, *deltas] if file is not None)
+    index = trackIntervalCache.get(key)
+    if index is None:
+        index = TrackIntervalIndex.from_track_dict(tracks)
+        trackIntervalCache.put(key, index, index.nbytes)
+    return {key: tracks[key] for key in index.overlapping(frameStart, frameEnd)}
+
+
+def validateTrackDelta(
+    upsert: Dict[Any, dict], delete: Iterable[Any]
+) -> Tuple[Dict[str, dict], List[str]]:
+    """
+    Validate the tracks and keys of an edit, keying both the upserts and the
+    deletes by the string of their track id.
+    """
+    validated_upsert: Dict[str, dict] = {}
+    for track_id, track in upsert.items():
+        validated = models.Track(**track)
+        if str(track_id) != str(validated.trackId):
+            raise RestException(
+                f"Track {track_id} is upserted with trackId {validated.trackId}"
+            )
+        validated_upsert[str(track_id)] = validated.dict(exclude_none=True)
+
+    validated_delete: List[str] = []
+    for track_id in delete:
+        if isinstance(track_id, bool) or not re.fullmatch(r"-?\d+", str(track_id)):
+            raise RestException(f"Invalid track id to delete: {track_id!r}")
+        validated_delete.append(str(int(track_id)))
+    return validated_upsert, validated_delete
+
+
+def saveTrackEdit(folder, item, upsert: Dict[str, dict], delete: List[str], user):
+    """Apply validated upserts and deletes to the current result of a folder"""
+    if item is not None and resultBackend == "track" and isTrackBackendItem(item):
+        ResultTrack().applyDelta(folder, upsert, delete)
+        clearResultHash(item)
+        touchItem(item)
+        ConfidenceSummary().update(
+            item,
+            ResultTrack().trackDict(folder, fields=["confidencePairs"]),
+            upsert,
+            delete,
         )
-    return json.loads(b"".join(list(File().download(file, headers=False)())).decode())
+        return
 
+    tracks = loadResultTracks(item)
+    applyDelta(tracks, {"upsert": upsert, "delete": delete})
+    if item is None or resultBackend == "track" or isTrackBackendItem(item):
+        saveTracks(folder, tracks, user)
+    else:
+        saveTrackDelta(folder, item, tracks, upsert, delete, user)
 
-def saveTracks(folder, tracks, user):
-    timestamp = datetime.now().strftime("%m-%d-%Y_%H:%M:%S")
-    item_name = f"result_{timestamp}.json"
 
-    move_existing_result_to_auxiliary_folder(folder, user)
-    newResultItem = Item().createItem(item_name, user, folder)
-    Item().setMetadata(newResultItem, {"detection": str(folder["_id"])}, allowNull=True)
+def clearResultHash(item: Item):
+    """
+    Mark the result file of a track backend item as out of date, so that it
+    is written back before the item is replaced, see writeBackTrackBackendItem.
+    """
+    Item().update(
+        {"_id": item["_id"]}, {"$unset": {"meta.resultHash": ""}}, multi=False
+    )
+    item.get("meta", {}).pop("resultHash", None)
+
+
+def touchItem(item: Item):
+    """
+    Set the updated time of a result item to now.  Edits that are not stored
+    as files must do so, since the time is part of its resultVersion.
+    """
+    updated = datetime.utcnow()
+    Item().update({"_id": item["_id"]}, {"$set": {"updated": updated}}, multi=False)
+    item["updated"] = updated
+
+
+def saveTrackDelta(
+    folder,
+    item,
+    tracks: Dict[str, dict],
+    upsert: Dict[str, dict],
+    delete: Iterable[str],
+    user,
+):
+    """
+    Append an edit to the current result item.  tracks is the full result with
+    the edit applied, which replaces the item instead whenever the edit cannot
+    be stored as a delta or the item's deltas would pass a threshold.
+    """
+    base, _ = getResultFiles(item)
+    delta_bytes = json.dumps({"upsert": upsert, "delete": list(delete)}).encode()
+    if not deltaSaves or base is None or resultFileFormat(base) == "csv":
+        saveTracks(folder, tracks, user)
+        return
+
+    deltaCount, deltaBytes = reserveDelta(item, len(delta_bytes))
+    if deltaCount > deltaMaxCount or deltaBytes > deltaMaxBytes:
+        saveTracks(folder, tracks, user)
+        return
 
-    json_bytes = json.dumps(tracks).encode()
-    byteIO = io.BytesIO(json_bytes)
     Upload().uploadFromFile(
-        byteIO,
-        len(json_bytes),
-        item_name,
+        io.BytesIO(delta_bytes),
+        len(delta_bytes),
+        f"{deltaFilePrefix}{deltaCount:06d}.json",
         parentType="item",
-        parent=newResultItem,
+        parent=item,
         user=user,
         mimeType="application/json",
     )
+    ConfidenceSummary().update(item, tracks, upsert, delete)
+
+
+def reserveDelta(item: Item, size: int) -> Tuple[int, int]:
+    """
+    Atomically claim the next delta number of a result item, adding size to
+    its delta bytes, and return the new deltaCount and deltaBytes.  Concurrent
+    saves each get their own number, so their delta files never collide.
+    Also bumps the item's updated time, and updates item in place.
+    """
+    reserved = Item().collection.find_one_and_update(
+        {"_id": item["_id"]},
+        {
+            "$inc": {"meta.deltaCount": 1, "meta.deltaBytes": size},
+            "$set": {"updated": datetime.utcnow()},
+        },
+        projection={"meta": True, "updated": True},
+        return_document=ReturnDocument.AFTER,
+    )
+    item["meta"] = reserved["meta"]
+    item["updated"] = reserved["updated"]
+    return reserved["meta"]["deltaCount"], reserved["meta"]["deltaBytes"]
+
+
+def iterEncodedTracks(tracks: Dict[Any, dict], format: str) -> Iterator[bytes]:
+    """Encode a result one track at a time, as json.dumps or binary.dumps would"""
+    if format == "msgpack":
+        yield from binary.iter_dumps(tracks)
+        return
+    separator = "{"
+    for key, track in tracks.items():
+        yield f"{separator}{json.dumps(str(key))}: {json.dumps(track)}".encode()
+        separator = ", "
+    yield b"}" if tracks else b"{}"
+
+
+def _resultFileType(item_name: str, format: str) -> Tuple[str, str]:
+    """The file name and mime type of a result stored as format"""
+    file_name = item_name
+    mimeType = binary.MsgpackMimeTypes[0] if format == "msgpack" else "application/json"
+    if resultEncoding != "identity":
+        file_name = f"{item_name}.{EncodingExtensions[resultEncoding]}"
+        mimeType = f"application/{resultEncoding}"
+    return file_name, mimeType
+
+
+def _encodeResult(spool: BinaryIO, tracks: Dict[Any, dict], format: str) -> str:
+    """Write tracks to spool as a result file, returning their payload hash"""
+    writer = spool
+    if resultEncoding != "identity":
+        writer = compressing_writer(spool, resultEncoding)
+    digest = hashlib.sha256()
+    for chunk in iterEncodedTracks(tracks, format):
+        digest.update(chunk)
+        writer.write(chunk)
+    if writer is not spool:
+        writer.close()
+    return digest.hexdigest()
+
+
+def writeBackTrackBackendItem(folder, item, user):
+    """
+    Replace the file of a result backed by the ResultTrack collection with the
+    tracks of the collection, which hold the edits made since it was saved.
+    """
+    base, deltas = getResultFiles(item)
+    format = folderResultFormat(folder)
+    if base is not None and resultFileFormat(base) in ("json", "msgpack"):
+        format = resultFileFormat(base)
+    file_name, mimeType = _resultFileType(item["name"], format)
+    with tempfile.SpooledTemporaryFile(max_size=uploadSpoolBytes) as spool:
+        resultHash = _encodeResult(spool, ResultTrack().trackDict(folder), format)
+        size = spool.tell()
+        spool.seek(0)
+        Upload().uploadFromFile(
+            spool,
+            size,
+            file_name,
+            parentType="item",
+            parent=item,
+            user=user,
+            mimeType=mimeType,
+        )
+    for file in [base, *deltas]:
+        if file is not None:
+            File().remove(file)
+    Item().setMetadata(item, {"resultHash": resultHash})
+
+
+def saveTracks(folder, tracks, user):
+    """
+    Store tracks as the new result of a folder, moving the previous results to
+    its auxiliary folder.  Nothing is stored when the tracks are the same as
+    those of the current result.
+    """
+    timestamp = datetime.now().strftime("%m-%d-%Y_%H:%M:%S")
+    format = folderResultFormat(folder)
+    item_name = f"result_{timestamp}.{format}"
+    file_name, mimeType = _resultFileType(item_name, format)
+
+    with tempfile.SpooledTemporaryFile(max_size=uploadSpoolBytes) as spool:
+        resultHash = _encodeResult(spool, tracks, format)
+
+        current = getCurrentResultItem(folder)
+        if current is not None:
+            meta = current.get("meta", {})
+            if meta.get("resultHash") == resultHash and not meta.get("deltaCount"):
+                return
+
+        auxiliary = move_existing_result_to_auxiliary_folder(folder, user)
+        newResultItem = Item().createItem(item_name, user, folder)
+        Item().setMetadata(
+            newResultItem,
+            {"detection": str(folder["_id"]), "resultHash": resultHash},
+            allowNull=True,
+        )
+        # Updated in place, as callers may still save their copy of the folder
+        folder.setdefault("meta", {})["currentResult"] = str(newResultItem["_id"])
+        Folder().update(
+            {"_id": folder["_id"]},
+            {"$set": {"meta.currentResult": folder["meta"]["currentResult"]}},
+            multi=False,
+        )
+
+        size = spool.tell()
+        spool.seek(0)
+        Upload().uploadFromFile(
+            spool,
+            size,
+            file_name,
+            parentType="item",
+            parent=newResultItem,
+            user=user,
+            mimeType=mimeType,
+        )
+    ConfidenceSummary().create(newResultItem, tracks)
+    if resultBackend == "track":
+        ResultTrack().replaceForFolder(folder, tracks)
+        Item().setMetadata(newResultItem, {"trackBackend": True})
+    else:
+        ResultTrack().removeForFolder(folder)
+
+    if retentionAuto:
+        history = (
+            Item()
+            .find({"folderId": auxiliary["_id"], "meta.detection": str(folder["_id"])})
+            .count()
+        )
+        if history > 2 * retentionKeep + retentionMaxCheckpoints:
+            pruneResultHistory(folder, user)
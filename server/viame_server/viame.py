@@ -12,10 +12,12 @@ from girder.models.token import Token
 from viame_tasks.tasks import convert_images, convert_video, run_pipeline
 
 from .model.attribute import Attribute
+from .model.frame_index import FrameIndex
 from .serializers import meva as meva_serializer
 from .serializers import viame as viame_serializer
 from .transforms import GetPathFromFolderId, GetPathFromItemId
 from .utils import (
+    ImageSequenceType,
     csvRegex,
     get_or_create_auxiliary_folder,
     getTrackData,
@@ -23,6 +25,7 @@ from .utils import (
     move_existing_result_to_auxiliary_folder,
     safeImageRegex,
     saveTracks,
+    trackDataCache,
     videoRegex,
     ymlRegex,
 )
@@ -42,6 +45,8 @@ class Viame(Resource):
         self.route("POST", ("validate_files",), self.validate_files)
         self.route("DELETE", ("attribute", ":id"), self.delete_attribute)
         self.route("GET", ("valid_images",), self.get_valid_images)
+        self.route("GET", ("track_cache",), self.get_track_cache)
+        self.route("DELETE", ("track_cache",), self.clear_track_cache)
 
     @access.user
     @describeRoute(Description("Get available pipelines"))
@@ -153,6 +158,7 @@ class Viame(Resource):
 
         In either case, the following may run synchronously:
             Conversion of CSV annotations into track JSON
+            Building of the frame index of image sequences
         """
         user = self.getCurrentUser()
         auxiliary = get_or_create_auxiliary_folder(folder, user)
@@ -222,6 +228,9 @@ class Viame(Resource):
             for item in csvItems:
                 Item().move(item, auxiliary)
 
+        if folder.get("meta", {}).get("type") == ImageSequenceType:
+            FrameIndex().build(folder)
+
         return folder
 
     @access.user
@@ -268,8 +277,21 @@ class Viame(Resource):
         )
     )
     def get_valid_images(self, folder):
-        return Folder().childItems(
-            folder,
-            filters={"lowerName": {"$regex": safeImageRegex}},
-            sort=[("lowerName", pymongo.ASCENDING)],
-        )
+        index = FrameIndex().getForFolder(folder)
+        return [
+            {"_id": itemId, "name": name}
+            for itemId, name in zip(index["itemIds"], index["names"])
+        ]
+
+    @access.admin
+    @autoDescribeRoute(
+        Description("Get size and hit/miss/eviction counters of the track cache")
+    )
+    def get_track_cache(self):
+        return trackDataCache.stats()
+
+    @access.admin
+    @autoDescribeRoute(Description("Empty the track cache"))
+    def clear_track_cache(self):
+        trackDataCache.clear()
+        return trackDataCache.stats()
@@ -1,9 +1,11 @@
+import hashlib
 import io
 import json
 import re
 import urllib
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 
+import cherrypy
 from girder.api import access
 from girder.api.describe import Description, autoDescribeRoute
 from girder.api.rest import (
@@ -19,17 +21,32 @@ from girder.models.folder import Folder
 from girder.models.item import Item
 from girder.models.upload import Upload
 from girder.utility import ziputil
+from girder_jobs.models.job import Job
 
-from viame_server.serializers import meva, models, viame
+from viame_server.compression import accepts_encoding, decompress_chunks, file_encoding
+from viame_server.model.confidence_summary import ConfidenceSummary
+from viame_server.model.frame_index import FrameIndex
+from viame_server.serializers import binary, meva, viame
+from viame_server.serializers.intervals import trim_track
 from viame_server.utils import (
     ImageMimeTypes,
     ImageSequenceType,
     VideoMimeTypes,
     VideoType,
-    getTrackData,
+    conditionalResponse,
+    exportCache,
+    fileCacheKey,
+    getCurrentResultItem,
+    getResultFiles,
+    isTrackBackendItem,
+    loadResultTracks,
+    loadResultTracksInWindow,
     move_existing_result_to_auxiliary_folder,
-    safeImageRegex,
-    saveTracks,
+    pruneResultHistory,
+    resultFileFormat,
+    resultVersion,
+    saveTrackEdit,
+    validateTrackDelta,
 )
 
 
@@ -40,15 +57,15 @@ class ViameDetection(Resource):
         self.route("GET", (), self.get_detection)
         self.route("PUT", (), self.save_detection)
         self.route("GET", ("clip_meta",), self.get_clip_meta)
+        self.route("GET", ("confidence_summary",), self.get_confidence_summary)
         self.route("GET", (":id", "export"), self.get_export_urls)
         self.route("GET", (":id", "export_detections"), self.export_detections)
         self.route("GET", (":id", "export_all"), self.export_all)
+        self.route("POST", (":id", "prune"), self.prune_history)
 
     def _get_clip_meta(self, folder):
-        detections = list(
-            Item().find({"meta.detection": str(folder["_id"])}).sort([("created", -1)])
-        )
-        detection = detections[0] if len(detections) else None
+        # Each lookup is a single indexed query, see GirderPlugin.load
+        detection = getCurrentResultItem(folder)
 
         videoUrl = None
         video = None
@@ -60,7 +77,8 @@ class ViameDetection(Resource):
             }
         )
         if item:
-            video = Item().childFiles(item)[0]
+            video = File().findOne({'itemId': item['_id']})
+        if video:
             videoUrl = (
                 f'/api/v1/file/{str(video["_id"])}/download?contentDisposition=inline'
             )
@@ -73,28 +91,32 @@ class ViameDetection(Resource):
         }
 
     def _load_detections(self, folder):
-        detectionItems = list(
-            Item().findWithPermissions(
-                {"meta.detection": str(folder["_id"])},
-                user=self.getCurrentUser(),
-            )
-        )
-        detectionItems.sort(key=lambda d: d["created"], reverse=True)
-        if not len(detectionItems):
-            return None
-        file = Item().childFiles(detectionItems[0])[0]
-
-        return file
+        return getCurrentResultItem(folder, self.getCurrentUser())
+
+    def _download_result(self, file, format, contentEncoding):
+        """Stream a result file in the format it is stored in"""
+        encoding = file_encoding(file["name"])
+        if encoding is None:
+            return File().download(file, contentDisposition="inline")
+
+        # Serve compressed results as stored whenever the client can decode them
+        setRawResponse()
+        if format == "msgpack":
+            setResponseHeader("Content-Type", binary.MsgpackMimeTypes[0])
+        else:
+            setResponseHeader("Content-Type", "application/json")
+        stream = File().download(file, headers=False)
+        if contentEncoding is not None:
+            setResponseHeader("Content-Encoding", contentEncoding)
+            setResponseHeader("Content-Length", file["size"])
+            return stream
+        return lambda: decompress_chunks(stream(), encoding)
 
     def _generate_detections(self, folder, excludeBelowThreshold):
-        detectionItems = list(
-            Item().findWithPermissions(
-                {"meta.detection": str(folder["_id"])}, user=self.getCurrentUser()
-            )
-        )
-        detectionItems.sort(key=lambda d: d["created"], reverse=True)
-        item = detectionItems[0]
-        file = Item().childFiles(item)[0]
+        item = self._load_detections(folder)
+        if item is None:
+            raise RestException("Clip has no detections", code=404)
+        file, _ = getResultFiles(item)
 
         # TODO: deprecated, remove after we migrate everyone to json
         if "csv" in file["exts"]:
@@ -102,21 +124,47 @@ class ViameDetection(Resource):
 
         filename = ".".join([file["name"].split(".")[:-1][0], "csv"])
 
-        imageFiles = [
-            f['name']
-            for f in Folder()
-            .childItems(folder, filters={"lowerName": {"$regex": safeImageRegex}})
-            .sort("lowerName")
-        ]
+        imageFiles = FrameIndex().getForFolder(folder)["names"]
         thresholds = folder.get("meta", {}).get("confidenceFilters", {})
 
-        track_dict = getTrackData(file)
+        cacheKey = (
+            "csv",
+            resultVersion(item),
+            excludeBelowThreshold,
+            hashlib.sha1(json.dumps(thresholds, sort_keys=True).encode()).hexdigest(),
+            hashlib.sha1("\n".join(imageFiles).encode()).hexdigest(),
+        )
+
+        def generateRows():
+            passing = None
+            if excludeBelowThreshold:
+                summary = ConfidenceSummary().findForItem(item)
+                if summary is not None:
+                    passing = ConfidenceSummary().passingKeys(summary, item, thresholds)
+            return viame.export_tracks_as_csv(
+                loadResultTracks(item),
+                excludeBelowThreshold,
+                thresholds,
+                imageFiles,
+                trusted=True,
+                passing=passing,
+            )
+
+        if exportCache.contains(cacheKey):
+            # Opened once iterated, so that an unread response leaks no file
+            def downloadGenerator():
+                cached = exportCache.open(cacheKey)
+                if cached is None:  # Evicted meanwhile
+                    yield from exportCache.tee(cacheKey, generateRows())
+                else:
+                    yield from exportCache.stream(cached)
+
+            return filename, downloadGenerator
+
+        rows = generateRows()
 
         def downloadGenerator():
-            for data in viame.export_tracks_as_csv(
-                track_dict, excludeBelowThreshold, thresholds, imageFiles
-            ):
-                yield data
+            yield from exportCache.tee(cacheKey, rows)
 
         return filename, downloadGenerator
 
@@ -241,7 +289,25 @@ class ViameDetection(Resource):
 
     @access.user
     @autoDescribeRoute(
-        Description("Get detections of a clip").modelParam(
+        Description(
+            "Remove the result history of a clip that is not retained. "
+            "The returned job reports the reclaimed bytes once it completes."
+        ).modelParam(
+            "id",
+            description="folder id of a clip",
+            model=Folder,
+            required=True,
+            level=AccessType.WRITE,
+        )
+    )
+    def prune_history(self, folder):
+        user = self.getCurrentUser()
+        return Job().filter(pruneResultHistory(folder, user), user)
+
+    @access.user
+    @autoDescribeRoute(
+        Description("Get detections of a clip")
+        .modelParam(
             "folderId",
             description="folder id of a clip",
             model=Folder,
@@ -249,14 +315,76 @@ class ViameDetection(Resource):
             required=True,
             level=AccessType.READ,
         )
+        .param(
+            "frameStart",
+            "Only return tracks ending at or after this frame",
+            paramType="query",
+            dataType="integer",
+            required=False,
+        )
+        .param(
+            "frameEnd",
+            "Only return tracks beginning at or before this frame",
+            paramType="query",
+            dataType="integer",
+            required=False,
+        )
+        .param(
+            "trimFeatures",
+            "Only return the features of those tracks within the frame window, "
+            "and the closest feature on either side of it",
+            paramType="query",
+            dataType="boolean",
+            default=False,
+        )
     )
-    def get_detection(self, folder):
-        file = self._load_detections(folder)
-        if file is None:
+    def get_detection(self, folder, frameStart, frameEnd, trimFeatures):
+        item = self._load_detections(folder)
+        if item is None:
             return {}
-        if "csv" in file["exts"]:
-            return getTrackData(file)
-        return File().download(file, contentDisposition="inline")
+        file, deltas = getResultFiles(item)
+        format = "json"
+        accept = cherrypy.request.headers.get("Accept", "")
+        if binary.msgpack_available() and binary.accepts_msgpack(accept):
+            format = "msgpack"
+        setResponseHeader("Vary", "Accept, Accept-Encoding")
+        windowed = frameStart is not None or frameEnd is not None
+        passthrough = not (
+            windowed
+            or isTrackBackendItem(item)
+            or deltas
+            or resultFileFormat(file) != format
+        )
+        # Stored compressed results are sent as they are when the client allows
+        contentEncoding = file_encoding(file["name"]) if passthrough else None
+        acceptEncoding = cherrypy.request.headers.get("Accept-Encoding", "")
+        if contentEncoding and not accepts_encoding(acceptEncoding, contentEncoding):
+            contentEncoding = None
+
+        representation = f"{format}:{contentEncoding}"
+        if windowed:
+            representation += f":{frameStart}:{frameEnd}:{trimFeatures}"
+        version = resultVersion(item, file, deltas)
+        etag = f"{version}-{hashlib.sha1(representation.encode()).hexdigest()[:16]}"
+        if conditionalResponse(etag, item.get("updated")):
+            return b""
+
+        if not passthrough:
+            if windowed:
+                tracks = loadResultTracksInWindow(item, frameStart, frameEnd)
+                if trimFeatures:
+                    tracks = {
+                        key: trim_track(track, frameStart, frameEnd)
+                        for key, track in tracks.items()
+                    }
+            else:
+                tracks = loadResultTracks(item)
+            if format == "msgpack":
+                setRawResponse()
+                setResponseHeader("Content-Type", binary.MsgpackMimeTypes[0])
+                return binary.dumps(tracks)
+            return tracks
+        return self._download_result(file, format, contentEncoding)
 
     @access.user
     @autoDescribeRoute(
@@ -270,7 +398,58 @@ class ViameDetection(Resource):
         )
     )
     def get_clip_meta(self, folder):
-        return self._get_clip_meta(folder)
+        clipMeta = self._get_clip_meta(folder)
+        detection = clipMeta["detection"]
+        video = clipMeta["video"]
+        parts = [
+            str(folder["_id"]),
+            str(folder.get("updated")),
+            str(detection["_id"]) if detection else "",
+            str(detection.get("updated")) if detection else "",
+            ":".join(fileCacheKey(video)) if video else "",
+        ]
+        lastModified = max(
+            (d["updated"] for d in (folder, detection) if d and d.get("updated")),
+            default=None,
+        )
+        etag = hashlib.sha1("/".join(parts).encode()).hexdigest()
+        if conditionalResponse(etag, lastModified):
+            return b""
+        return clipMeta
+
+    @access.user
+    @autoDescribeRoute(
+        Description("Summarize the confidence of the tracks of a clip")
+        .modelParam(
+            "folderId",
+            description="folder id of a clip",
+            model=Folder,
+            paramType="query",
+            required=True,
+            level=AccessType.READ,
+        )
+        .jsonParam(
+            "thresholds",
+            "Confidence thresholds by type, defaults to the folder's confidenceFilters",
+            paramType="query",
+            requireObject=True,
+            required=False,
+        )
+    )
+    def get_confidence_summary(self, folder, thresholds):
+        if thresholds is None:
+            thresholds = folder.get("meta", {}).get("confidenceFilters", {})
+        detection = self._get_clip_meta(folder)["detection"]
+        summary = ConfidenceSummary().findForItem(detection) if detection else None
+        if summary is None:
+            return None
+        return {
+            "bins": summary["bins"],
+            "histograms": summary["histograms"],
+            "total": ConfidenceSummary().trackCount(summary),
+            "passing": ConfidenceSummary().countPassing(summary, detection, thresholds),
+            "thresholds": thresholds,
+        }
 
     @access.user
     @autoDescribeRoute(
@@ -291,19 +470,15 @@ class ViameDetection(Resource):
         user = self.getCurrentUser()
         upsert: Dict[str, dict] = tracks.get('upsert', {})
         delete: List[str] = tracks.get('delete', [])
-        track_dict = getTrackData(self._load_detections(folder))
+        item = self._load_detections(folder)
 
-        for track_id in delete:
-            track_dict.pop(str(track_id), None)
-        for track_id, track in upsert.items():
-            validated: models.Track = models.Track(**track)
-            track_dict[str(track_id)] = validated.dict(exclude_none=True)
+        validated_upsert, validated_delete = validateTrackDelta(upsert, delete)
 
         upserted_len = len(upsert.keys())
         deleted_len = len(delete)
 
         if upserted_len or deleted_len:
-            saveTracks(folder, track_dict, user)
+            saveTrackEdit(folder, item, validated_upsert, validated_delete, user)
 
         return {
             "updated": upserted_len,